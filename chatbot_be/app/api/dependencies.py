@@ -0,0 +1,24 @@
+"""
+FastAPI dependencies for services built during application startup.
+Handlers read services from app.state instead of importing app.api.server.
+"""
+
+from typing import Optional
+
+from fastapi import Request
+
+from app.services.conversational_service import ConversationalService
+from app.services.rag_service import RAGService
+from app.services.semantic_cache import SemanticChatCache
+
+def get_rag_service(request: Request) -> Optional[RAGService]:
+    """Get the RAG service (None if startup has not completed)."""
+    return getattr(request.app.state, "rag_service", None)
+
+def get_conversational_service(request: Request) -> ConversationalService:
+    """Get the conversational service built at startup."""
+    return request.app.state.conversational_service
+
+def get_semantic_cache(request: Request) -> Optional[SemanticChatCache]:
+    """Get the semantic response cache built at startup (None when disabled)."""
+    return getattr(request.app.state, "semantic_cache", None)
@@ -3,24 +3,102 @@ FastAPI application server setup.
 Main entry point for the DeepSeek RAG Chatbot API.
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from logging.handlers import QueueHandler, QueueListener
+import asyncio
+import atexit
+import queue
 import time
 import logging
 
 from app.core.config import settings
 from app.core.cors import setup_cors
-from app.core.exceptions import ChatbotBaseException
+from app.core.responses import AppJSONResponse
+from app.core.middleware import ErrorTranslatorMiddleware, RequestTimingMiddleware
 from app.api.v1 import chat, health, rag, sql
+from app.models.database import database
+from app.services.llm_client import llm_client
 from app.services.rag_service import RAGService
+from app.services.sql_client import sql_client, shutdown_sql_executor
+from app.services.conversational_service import ConversationalService
+from app.services.semantic_cache import SemanticChatCache
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; records are formatted on the caller but written to stderr by a
+# listener thread, so log I/O never blocks the event loop
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # Track application startup time
 app_start_time = time.time()
 
+def _warm_up(rag_service: RAGService) -> None:
+    """Run one embedding + search so the first user request doesn't pay model and index warm-up."""
+    rag_service.vector_store.encode(["warmup"])
+    rag_service.vector_store.search("warmup", top_k=1)
+
+async def _start_rag(rag_service: RAGService) -> None:
+    """Build the index and warm up the model in the background; RAG requests get a 503 until ready."""
+    try:
+        # Load the embedding model in a thread while products are fetched
+        model_loading = asyncio.create_task(asyncio.to_thread(lambda: rag_service.vector_store.model))
+        await rag_service.initialize()
+        await model_loading
+        await asyncio.to_thread(_warm_up, rag_service)
+        logger.info("RAG service ready")
+    except Exception as e:
+        logger.error(f"RAG service startup failed: {str(e)}")
+
+async def _warm_sql() -> None:
+    """Precompute the SQL agent's table info in the background so the first SQL question doesn't reflect the schema."""
+    try:
+        await asyncio.to_thread(sql_client.warm_up)
+        logger.info("SQL schema info ready")
+    except Exception as e:
+        logger.error(f"SQL schema warm-up failed: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup and release them on shutdown."""
+    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    
+    try:
+        # Build the RAG index in the background so the server accepts traffic immediately;
+        # keep a reference so the task isn't garbage collected
+        rag_service = RAGService()
+        app.state.rag_task = asyncio.create_task(_start_rag(rag_service))
+        app.state.sql_warmup_task = asyncio.create_task(_warm_sql())
+        
+        # Build request-path services once so handlers only read app.state
+        app.state.rag_service = rag_service
+        app.state.conversational_service = ConversationalService(rag_service)
+        app.state.semantic_cache = SemanticChatCache(
+            rag_service.vector_store,
+            threshold=settings.semantic_cache_threshold,
+            ttl_seconds=settings.session_timeout_minutes * 60
+        ) if settings.semantic_cache_enabled else None
+        
+        logger.info("All services initialized successfully")
+        
+    except Exception as e:
+        logger.error(f"Failed to initialize services: {str(e)}")
+        raise
+    
+    yield
+    
+    # Cleanup on shutdown
+    logger.info("Shutting down application")
+    app.state.rag_task.cancel()
+    app.state.sql_warmup_task.cancel()
+    shutdown_sql_executor()
+    await llm_client.aclose()
+    await database.close()
+
 def create_application() -> FastAPI:
     """Create and configure the FastAPI application."""
     
@@ -29,9 +107,20 @@ def create_application() -> FastAPI:
         description="Intelligent chatbot with RAG and SQL capabilities",
         version=settings.app_version,
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        default_response_class=AppJSONResponse,
+        lifespan=lifespan
     )
     
+    # Compress large payloads (RAG answers, schema listings); small responses skip it
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+    
+    # Translate service exceptions into JSON error responses
+    app.add_middleware(ErrorTranslatorMiddleware)
+    
+    # Report handler latency on every response
+    app.add_middleware(RequestTimingMiddleware)
+    
     # Setup CORS
     setup_cors(app)
     
@@ -46,44 +135,6 @@ def create_application() -> FastAPI:
 # Create application instance
 app = create_application()
 
-# Global services
-rag_service = None
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup."""
-    global rag_service
-    
-    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
-    
-    try:
-        # Initialize RAG service
-        rag_service = RAGService()
-        await rag_service.initialize()
-        
-        logger.info("All services initialized successfully")
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize services: {str(e)}")
-        raise
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown."""
-    logger.info("Shutting down application")
-
-@app.exception_handler(ChatbotBaseException)
-async def chatbot_exception_handler(request, exc: ChatbotBaseException):
-    """Handle custom chatbot exceptions."""
-    return HTTPException(
-        status_code=500,
-        detail={
-            "error": exc.__class__.__name__,
-            "message": exc.message,
-            "details": exc.details
-        }
-    )
-
 @app.get("/")
 async def root():
     """Root endpoint with basic application info."""
@@ -92,9 +143,4 @@ async def root():
         "version": settings.app_version,
         "docs": "/docs",
         "uptime": time.time() - app_start_time
-    }
-
-# Make services available to other modules
-def get_rag_service() -> RAGService:
-    """Get the global RAG service instance."""
-    return rag_service
\ No newline at end of file
+    }
\ No newline at end of file
@@ -3,39 +3,56 @@ RAG (Retrieval Augmented Generation) endpoints.
 Direct access to document retrieval and knowledge-based queries.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
 import time
 import logging
-from datetime import datetime
+import orjson
 
 from app.schemas.rag import RAGRequest, RAGResponse, DocumentUploadRequest
-from app.core.exceptions import RAGServiceException
+from app.api.dependencies import get_rag_service
+from app.core.exceptions import RAGServiceException, RAGServiceInitializing
+from app.services.rag_service import RAGService
 
 router = APIRouter(tags=["RAG"])
 logger = logging.getLogger(__name__)
 
+async def _sse_events(tokens):
+    """Format answer fragments as server-sent events, ending with a done event."""
+    async for token in tokens:
+        # Multi-line fragments need one data field per line
+        yield "".join(f"data: {line}\n" for line in token.split("\n")) + "\n"
+    yield "event: done\ndata: \n\n"
+
 @router.post("/rag", response_model=RAGResponse)
-async def ask_rag_question(request: RAGRequest):
+async def ask_rag_question(request: RAGRequest,
+                           stream: bool = False,
+                           rag_service: Optional[RAGService] = Depends(get_rag_service)):
     """
     Ask a question using RAG (Retrieval Augmented Generation).
     Searches documents and generates contextual answers.
+    With ?stream=true the answer is sent as server-sent events while it is generated.
     """
     try:
         start_time = time.time()
         
-        # TODO: Import and use RAGService once properly moved
-        from app.api.server import get_rag_service
-        rag_service = get_rag_service()
-        
-        if not rag_service or not rag_service.is_initialized:
+        if not rag_service:
             raise RAGServiceException("RAG service is not initialized")
         
-        # Get relevant context
+        # Get relevant context (raises RAGServiceInitializing while the index is being built)
         context_docs = await rag_service.search_context(
             request.question, 
             top_k=request.max_docs
         )
         
+        if stream:
+            return StreamingResponse(
+                _sse_events(rag_service.stream_answer(request.question, context_docs)),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"}
+            )
+        
         # Generate answer using context
         answer = await rag_service.generate_answer(
             request.question, 
@@ -44,14 +61,20 @@ async def ask_rag_question(request: RAGRequest):
         
         processing_time = time.time() - start_time
         
-        return RAGResponse(
-            answer=answer,
-            sources=["Vector store documents"] if request.include_sources else [],
-            confidence=0.85,  # TODO: Calculate actual confidence
-            retrieved_docs=len(context_docs),
-            processing_time=processing_time
+        # The answer is a plain string, so serialize the RAGResponse shape directly
+        return Response(
+            content=orjson.dumps({
+                "answer": answer,
+                "sources": ["Vector store documents"] if request.include_sources else [],
+                "confidence": 0.85,  # TODO: Calculate actual confidence
+                "retrieved_docs": len(context_docs),
+                "processing_time": processing_time
+            }),
+            media_type="application/json"
         )
         
+    except RAGServiceInitializing as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except RAGServiceException as e:
         logger.error(f"RAG service error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -71,7 +94,7 @@ async def upload_document(request: DocumentUploadRequest):
         return {
             "success": True,
             "message": "Document upload endpoint is in development",
-            "document_id": f"doc_{int(datetime.utcnow().timestamp())}"
+            "document_id": f"doc_{int(time.time())}"
         }
         
     except Exception as e:
@@ -79,14 +102,11 @@ async def upload_document(request: DocumentUploadRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/rag/health")
-async def rag_health_check():
+async def rag_health_check(rag_service: Optional[RAGService] = Depends(get_rag_service)):
     """
     Check the health status of the RAG service.
     """
     try:
-        from app.api.server import get_rag_service
-        rag_service = get_rag_service()
-        
         if not rag_service:
             return {"status": "not_initialized", "message": "RAG service not available"}
         
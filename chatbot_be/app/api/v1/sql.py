@@ -4,16 +4,26 @@ Direct access to database operations and data analysis.
 """
 
 from fastapi import APIRouter, HTTPException
+import asyncio
 import time
 import logging
 
 from app.schemas.sql import SQLRequest, SQLResponse, DatabaseSchemaResponse
 from app.models.database import database
-from app.core.exceptions import SQLServiceException
+from app.core.config import settings
+from app.core.responses import AppJSONResponse, PydanticResponse
+from app.services.sql_client import sql_client
+from app.utils.cache import TTLCache
 
 router = APIRouter(tags=["SQL"])
 logger = logging.getLogger(__name__)
 
+# Schema rarely changes, so serve repeat requests from memory
+_schema_cache = TTLCache(maxsize=1, ttl=settings.schema_cache_ttl_seconds)
+
+# Throttle health probes so they don't hit the database on every call
+_health_cache = TTLCache(maxsize=1, ttl=1.0)
+
 @router.post("/sql", response_model=SQLResponse)
 async def ask_sql_question(request: SQLRequest):
     """
@@ -28,29 +38,30 @@ async def ask_sql_question(request: SQLRequest):
         
         # Simple example query for testing
         if "count" in request.question.lower() and "product" in request.question.lower():
-            sql_query = "SELECT COUNT(*) as count FROM Products"
-            results = database.execute_query(sql_query)
+            sql_query = "SELECT COUNT(*) as count FROM products"
+            results = await database.execute_query(sql_query)
             
             answer = f"Found {results[0]['count']} products in the database."
             columns = ["count"]
             
         else:
             # Fallback for other questions
-            sql_query = "SELECT COUNT(*) as total_tables FROM sqlite_master WHERE type='table'"
-            results = database.execute_query(sql_query)
+            sql_query = "SELECT COUNT(*) as total_tables FROM information_schema.tables WHERE table_schema = 'public'"
+            results = await database.execute_query(sql_query)
             answer = "SQL endpoint is being reorganized. Please try asking about product counts for now."
             columns = ["total_tables"]
         
         execution_time = time.time() - start_time
         
-        return SQLResponse(
+        # Row data may hold Decimal/datetime values; let orjson render them as native JSON types
+        return AppJSONResponse(SQLResponse.model_construct(
             answer=answer,
             data=results,
             sql_query=sql_query if request.return_sql else None,
             row_count=len(results),
             execution_time=execution_time,
             columns=columns
-        )
+        ).model_dump())
         
     except Exception as e:
         logger.error(f"SQL endpoint error: {str(e)}")
@@ -63,45 +74,65 @@ async def get_database_schema():
     Returns table names, columns, and basic statistics.
     """
     try:
-        tables = database.get_all_tables()
-        table_info = []
+        cached = _schema_cache.get("schema")
+        if cached is not None:
+            return PydanticResponse(cached)
         
-        for table_name in tables:
-            # Get table schema
-            schema = database.get_table_schema(table_name)
-            columns = [col['name'] for col in schema]
-            
-            # Get row count
-            count_query = f"SELECT COUNT(*) as count FROM {table_name}"
-            count_result = database.execute_query(count_query)
-            row_count = count_result[0]['count'] if count_result else 0
-            
-            table_info.append({
-                "name": table_name,
-                "columns": columns,
-                "row_count": row_count
-            })
+        # Tables and their columns in one round-trip
+        tables = await database.get_tables_with_columns()
+        
+        # Exact row counts for every table in one round-trip
+        row_counts = await database.get_table_row_counts([table["table_name"] for table in tables])
+        
+        table_info = [
+            {
+                "name": table["table_name"],
+                "columns": list(table["columns"]),
+                "row_count": row_counts.get(table["table_name"], 0)
+            }
+            for table in tables
+        ]
         
-        return DatabaseSchemaResponse(
+        response = DatabaseSchemaResponse.model_construct(
             tables=table_info,
             total_tables=len(tables),
             database_name="Northwind"
         )
+        _schema_cache.set("schema", response)
+        return PydanticResponse(response)
         
     except Exception as e:
         logger.error(f"Schema endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/sql/refresh-schema")
+async def refresh_schema():
+    """
+    Reload the table definitions cached for the SQL agent after a schema change.
+    """
+    try:
+        table_count = await asyncio.to_thread(sql_client.refresh_schema)
+        _schema_cache.clear()
+        return {"success": True, "tables_available": table_count}
+        
+    except Exception as e:
+        logger.error(f"Schema refresh error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/sql/health")
 async def sql_health_check():
     """
     Check the health status of the SQL service.
     """
+    cached = _health_cache.get("health")
+    if cached is not None:
+        return cached
+    
     try:
         # Test database connection
-        tables = database.get_all_tables()
+        tables = await database.get_all_tables()
         
-        return {
+        status = {
             "status": "healthy",
             "message": "SQL service is ready",
             "database_connected": True,
@@ -110,4 +141,7 @@ async def sql_health_check():
         
     except Exception as e:
         logger.error(f"SQL health check error: {str(e)}")
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        status = {"status": "error", "message": str(e)}
+    
+    _health_cache.set("health", status)
+    return status
\ No newline at end of file
@@ -3,55 +3,94 @@ Core application configuration.
 Centralized configuration management for the DeepSeek RAG Chatbot.
 """
 
-import os
+from functools import cached_property, lru_cache
+from typing import List, Optional
 
-class Settings:
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
     """Application settings with environment variable support."""
-    
+
+    model_config = SettingsConfigDict(extra="ignore", frozen=True)
+
     # Application
     app_name: str = "DeepSeek RAG Chatbot"
     app_version: str = "1.0.0"
-    debug: bool = os.getenv("DEBUG", "false").lower() == "true"
-    
+    debug: bool = False
+
     # Server
-    host: str = os.getenv("HOST", "127.0.0.1")
-    port: int = int(os.getenv("PORT", "8000"))
-    reload: bool = os.getenv("RELOAD", "true").lower() == "true"
-    
+    host: str = "127.0.0.1"
+    port: int = 8000
+    reload: bool = True
+    workers: int = 1  # sessions live in process memory; >1 needs a shared session store
+
     # Database - PostgreSQL in Docker
-    db_host: str = os.getenv("DB_HOST", "localhost")
-    db_port: int = int(os.getenv("DB_PORT", "5432"))
-    db_name: str = os.getenv("DB_NAME", "northwind")
-    db_user: str = os.getenv("DB_USER", "postgres")
-    db_password: str = os.getenv("DB_PASSWORD", "postgres")
-    
-    @property
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_name: str = "northwind"
+    db_user: str = "postgres"
+    db_password: str = "postgres"
+
+    # Connection pool
+    db_min_size: int = 2
+    db_max_size: int = 20
+    db_command_timeout: float = 30.0
+    db_max_inactive_connection_lifetime: float = 300.0
+    db_statement_cache_size: int = 512
+
+    @cached_property
     def database_url(self) -> str:
         """Construct PostgreSQL database URL."""
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
-    
+
     # Vector Store
-    vector_store_path: str = os.getenv("VECTOR_STORE_PATH", "data/vector_store")
-    chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
-    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
-    
+    vector_store_path: str = "data/vector_store"
+    chunk_size: int = 1000
+    chunk_overlap: int = 200
+
+    # Embeddings: "onnx" runs the int8-quantized ONNX export via onnxruntime, "torch" the PyTorch model
+    embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_backend: str = "onnx"
+    embedding_onnx_file: str = "onnx/model_quint8_avx2.onnx"
+    # Optional Redis cache of embeddings, reused across restarts (e.g. redis://localhost:6379/0)
+    redis_url: Optional[str] = None
+    embedding_cache_ttl_seconds: int = 7 * 24 * 3600
+
     # LLM Configuration
-    llm_model: str = os.getenv("LLM_MODEL", "deepseek-coder")
-    llm_temperature: float = float(os.getenv("LLM_TEMPERATURE", "0.1"))
-    llm_max_tokens: int = int(os.getenv("LLM_MAX_TOKENS", "2000"))
-    
+    ollama_base_url: str = "http://localhost:11434"
+    llm_model: str = "deepseek-coder"  # SQL agent
+    rag_llm_model: str = "deepseek-coder"  # RAG answers; separate so LLM_MODEL doesn't change them
+    llm_temperature: float = 0.1
+    llm_max_tokens: int = 2000
+    sql_max_concurrency: int = 2  # concurrent LangChain SQL agent runs
+    sql_agent_verbose: bool = False  # print the agent's reasoning steps to stdout
+
     # RAG Configuration
-    max_retrieved_docs: int = int(os.getenv("MAX_RETRIEVED_DOCS", "5"))
-    similarity_threshold: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
-    
+    max_retrieved_docs: int = 5
+    similarity_threshold: float = 0.7
+
     # Session Management
-    session_timeout_minutes: int = int(os.getenv("SESSION_TIMEOUT_MINUTES", "30"))
-    max_conversation_history: int = int(os.getenv("MAX_CONVERSATION_HISTORY", "20"))
-    
+    session_timeout_minutes: int = 30
+    max_conversation_history: int = Field(20, gt=0)  # also sizes the per-session embedding ring buffer
+
+    # Caching
+    schema_cache_ttl_seconds: int = 60
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.92
+    answer_cache_threshold: float = 0.95  # RAG answer reuse across sessions
+    sql_cache_size: int = 512  # exact-question SQL agent answers
+    sql_cache_ttl_seconds: int = 300
+
     # CORS
-    cors_origins: list = ["http://localhost:8501", "http://127.0.0.1:8501"]
-    cors_methods: list = ["GET", "POST", "PUT", "DELETE"]
-    cors_headers: list = ["*"]
+    cors_origins: List[str] = Field(default_factory=lambda: ["http://localhost:8501", "http://127.0.0.1:8501"])
+    cors_methods: List[str] = Field(default_factory=lambda: ["GET", "POST", "PUT", "DELETE"])
+    cors_headers: List[str] = Field(default_factory=lambda: ["*"])
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the shared settings instance (usable as a FastAPI dependency)."""
+    return Settings()
 
 # Global settings instance
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
@@ -3,17 +3,131 @@ CORS configuration for the FastAPI application.
 Handles cross-origin resource sharing settings.
 """
 
+from typing import Iterable, List, Tuple
+
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from app.core.config import settings
 
+class PureASGICORSMiddleware:
+    """
+    Lightweight pure-ASGI CORS middleware.
+    Header values are pre-computed once so each request only does an origin
+    lookup; requests without an Origin header pass straight through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins: Iterable[str] = (),
+        allow_methods: Iterable[str] = ("GET",),
+        allow_headers: Iterable[str] = (),
+        allow_credentials: bool = False,
+        max_age: int = 600,
+    ):
+        self.app = app
+        self._allow_origins = frozenset(allow_origins)
+        self._allow_all_origins = "*" in self._allow_origins
+        self._allow_methods = frozenset(method.upper() for method in allow_methods)
+        self._allow_methods_str = ", ".join(sorted(self._allow_methods)).encode()
+        self._allow_all_headers = "*" in allow_headers
+        self._allow_headers_str = b"*" if self._allow_all_headers else ", ".join(allow_headers).encode()
+        self._allow_credentials = b"true" if allow_credentials else None
+        self._max_age = str(max_age).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        # Not a CORS request
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight_response(origin, request_method, request_headers, send)
+            return
+
+        if not self._is_allowed_origin(origin):
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = self._simple_headers(origin)
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    def _is_allowed_origin(self, origin: bytes) -> bool:
+        """Check the request origin against the allowlist."""
+        return self._allow_all_origins or origin.decode("latin-1") in self._allow_origins
+
+    def _allow_origin_value(self, origin: bytes) -> bytes:
+        """Echo the origin unless every origin is allowed without credentials."""
+        if self._allow_all_origins and self._allow_credentials is None:
+            return b"*"
+        return origin
+
+    def _simple_headers(self, origin: bytes) -> List[Tuple[bytes, bytes]]:
+        """Build the CORS headers appended to a regular response."""
+        headers = [(b"access-control-allow-origin", self._allow_origin_value(origin))]
+        if self._allow_credentials is not None:
+            headers.append((b"access-control-allow-credentials", self._allow_credentials))
+        if not (self._allow_all_origins and self._allow_credentials is None):
+            headers.append((b"vary", b"Origin"))
+        return headers
+
+    async def _preflight_response(self, origin: bytes, request_method: bytes,
+                                  request_headers: bytes, send: Send) -> None:
+        """Answer an OPTIONS preflight request directly."""
+        allowed = self._is_allowed_origin(origin) and request_method.decode("latin-1").upper() in self._allow_methods
+
+        headers = [
+            (b"access-control-allow-methods", self._allow_methods_str),
+            (b"access-control-max-age", self._max_age),
+            (b"content-type", b"text/plain; charset=utf-8"),
+        ]
+        if allowed:
+            headers.extend(self._simple_headers(origin))
+            # With credentials the wildcard is not honoured, so echo the requested headers
+            if self._allow_all_headers and request_headers is not None and self._allow_credentials is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            else:
+                headers.append((b"access-control-allow-headers", self._allow_headers_str))
+
+        body = b"OK" if allowed else b"Disallowed CORS request"
+        headers.append((b"content-length", str(len(body)).encode()))
+
+        await send({
+            "type": "http.response.start",
+            "status": 200 if allowed else 400,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
+
 def setup_cors(app: FastAPI) -> None:
     """Configure CORS middleware for the FastAPI application."""
-    
+
     app.add_middleware(
-        CORSMiddleware,
+        PureASGICORSMiddleware,
         allow_origins=settings.cors_origins,
         allow_credentials=True,
         allow_methods=settings.cors_methods,
         allow_headers=settings.cors_headers,
-    )
\ No newline at end of file
+    )
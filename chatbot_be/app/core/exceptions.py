@@ -8,6 +8,8 @@ from typing import Optional, Dict, Any
 class ChatbotBaseException(Exception):
     """Base exception for all chatbot-related errors."""
     
+    status_code = 500
+    
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
         self.message = message
         self.details = details or {}
@@ -17,6 +19,10 @@ class RAGServiceException(ChatbotBaseException):
     """Raised when RAG service encounters an error."""
     pass
 
+class RAGServiceInitializing(RAGServiceException):
+    """Raised when the RAG index is still being built in the background."""
+    status_code = 503
+
 class SQLServiceException(ChatbotBaseException):
     """Raised when SQL service encounters an error."""
     pass
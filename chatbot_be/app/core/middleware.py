@@ -0,0 +1,75 @@
+"""
+Pure-ASGI middleware for the FastAPI application.
+Avoids BaseHTTPMiddleware's per-request task and memory-channel overhead.
+"""
+
+import time
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.exceptions import ChatbotBaseException
+
+class ErrorTranslatorMiddleware:
+    """Translate uncaught ChatbotBaseException errors into JSON error responses."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except ChatbotBaseException as exc:
+            # Too late to replace the response, let the server handle it
+            if response_started:
+                raise
+
+            body = orjson.dumps({
+                "error": exc.__class__.__name__,
+                "message": exc.message,
+                "details": exc.details
+            })
+            await send({
+                "type": "http.response.start",
+                "status": exc.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+class RequestTimingMiddleware:
+    """Stamp each HTTP response with an x-response-time header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-response-time", f"{elapsed_ms:.2f}ms".encode())
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,45 @@
+"""
+Custom response classes for the FastAPI application.
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+
+def orjson_default(obj: Any) -> Any:
+    """Serialize database types orjson does not handle natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class AppJSONResponse(ORJSONResponse):
+    """
+    Default response class: orjson with support for asyncpg result types.
+    NUMERIC columns arrive as Decimal and are emitted as JSON numbers.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+        )
+
+class PydanticResponse(JSONResponse):
+    """
+    JSON response rendered straight from a Pydantic model.
+    Returning a Response skips FastAPI's jsonable_encoder and response_model
+    re-validation; pydantic-core serializes the model to bytes in one pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        return super().render(content)
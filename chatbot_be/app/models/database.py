@@ -4,11 +4,52 @@ Database connection and model definitions.
 Handles PostgreSQL connection for the Northwind database running in Docker.
 """
 
+import asyncio
 import asyncpg
 from typing import Optional, List, Dict, Any
 from app.core.config import settings
 from app.core.exceptions import ChatbotBaseException
 
+# Introspection queries, kept as constants so every connection reuses the same prepared statements
+TABLE_SCHEMA_SQL = """
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns 
+WHERE table_name = $1
+ORDER BY ordinal_position
+"""
+
+PUBLIC_TABLES_SQL = """
+SELECT table_name 
+FROM information_schema.tables 
+WHERE table_schema = 'public'
+"""
+
+TABLES_WITH_COLUMNS_SQL = """
+SELECT c.table_name, array_agg(c.column_name::text ORDER BY c.ordinal_position) AS columns
+FROM information_schema.columns c
+JOIN information_schema.tables t
+  ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+WHERE t.table_schema = 'public'
+GROUP BY c.table_name
+ORDER BY c.table_name
+"""
+
+# Failures raised by asyncpg for server errors, a closed/busy connection, or an unreachable host
+DB_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
+
+def quote_identifier(name: str) -> str:
+    """Quote a PostgreSQL identifier so it can be safely interpolated into SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """
+    Warm the connection's statement cache with the introspection queries.
+    conn.prepare() bypasses asyncpg's statement cache, so run the cheap
+    parameterized query once instead; later fetches skip parse/plan.
+    """
+    await conn.fetch(TABLE_SCHEMA_SQL, "")
+    await conn.fetch(PUBLIC_TABLES_SQL)
+
 class DatabaseConnection:
     """Manages PostgreSQL database connections for the Northwind database."""
     
@@ -20,35 +61,36 @@ class DatabaseConnection:
         if self._pool is None:
             try:
                 self._pool = await asyncpg.create_pool(
-                    host=settings.db_host,
-                    port=settings.db_port,
-                    user=settings.db_user,
-                    password=settings.db_password,
-                    database=settings.db_name,
-                    min_size=1,
-                    max_size=5
+                    dsn=settings.database_url,
+                    min_size=settings.db_min_size,
+                    max_size=settings.db_max_size,
+                    command_timeout=settings.db_command_timeout,
+                    max_inactive_connection_lifetime=settings.db_max_inactive_connection_lifetime,
+                    statement_cache_size=settings.db_statement_cache_size,
+                    init=_init_connection
                 )
-            except Exception as e:
-                raise ChatbotBaseException(f"Failed to connect to database: {str(e)}")
+            except DB_ERRORS as e:
+                raise ChatbotBaseException(f"Failed to connect to database: {str(e)}") from e
         
         return self._pool
     
-    async def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-        """Execute a SELECT query and return results as list of dictionaries."""
+    async def fetch_records(self, query: str, params: tuple = ()) -> List[asyncpg.Record]:
+        """
+        Execute a SELECT query and return the raw asyncpg records.
+        Records support key and index access, so read-only callers can skip dict conversion.
+        """
         try:
             pool = await self.get_pool()
             async with pool.acquire() as conn:
-                rows = await conn.fetch(query, *params)
-                
-                # Convert asyncpg.Record objects to dictionaries
-                results = []
-                for row in rows:
-                    results.append(dict(row))
-                
-                return results
+                return await conn.fetch(query, *params)
                 
-        except Exception as e:
-            raise ChatbotBaseException(f"Database query failed: {str(e)}")
+        except DB_ERRORS as e:
+            raise ChatbotBaseException(f"Database query failed: {str(e)}") from e
+    
+    async def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Execute a SELECT query and return results as list of dictionaries."""
+        rows = await self.fetch_records(query, params)
+        return [dict(row) for row in rows]
     
     async def execute_update(self, query: str, params: tuple = ()) -> int:
         """Execute an INSERT/UPDATE/DELETE query and return number of affected rows."""
@@ -59,29 +101,34 @@ class DatabaseConnection:
                 # Extract row count from result string like "UPDATE 1"
                 return int(result.split()[-1]) if result else 0
                 
-        except Exception as e:
-            raise ChatbotBaseException(f"Database update failed: {str(e)}")
+        except DB_ERRORS as e:
+            raise ChatbotBaseException(f"Database update failed: {str(e)}") from e
     
     async def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
         """Get schema information for a specific table."""
-        query = """
-        SELECT column_name, data_type, is_nullable
-        FROM information_schema.columns 
-        WHERE table_name = $1
-        ORDER BY ordinal_position
-        """
-        return await self.execute_query(query, (table_name.lower(),))
+        return await self.execute_query(TABLE_SCHEMA_SQL, (table_name.lower(),))
     
     async def get_all_tables(self) -> List[str]:
         """Get list of all table names in the database."""
-        query = """
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public'
-        """
-        results = await self.execute_query(query)
+        results = await self.fetch_records(PUBLIC_TABLES_SQL)
         return [row['table_name'] for row in results]
     
+    async def get_tables_with_columns(self) -> List[asyncpg.Record]:
+        """Get every public table with its ordered column names in a single round-trip."""
+        return await self.fetch_records(TABLES_WITH_COLUMNS_SQL)
+    
+    async def get_table_row_counts(self, table_names: List[str]) -> Dict[str, int]:
+        """Get exact row counts for the given tables in a single UNION ALL query."""
+        if not table_names:
+            return {}
+        
+        query = " UNION ALL ".join(
+            f"SELECT ${i}::text AS table_name, COUNT(*) AS count FROM public.{quote_identifier(name)}"
+            for i, name in enumerate(table_names, 1)
+        )
+        results = await self.fetch_records(query, tuple(table_names))
+        return {row['table_name']: row['count'] for row in results}
+    
     async def close(self):
         """Close the database connection pool."""
         if self._pool:
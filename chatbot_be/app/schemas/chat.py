@@ -3,27 +3,20 @@ Request and response schemas for chat interactions.
 Defines the data structures for conversational AI endpoints.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class ChatRequest(BaseModel):
     """Request model for chat interactions."""
-    question: str = Field(..., description="User's question or message")
+    question: str = Field(..., description="User's question or message", examples=["How many products do we have?"])
     session_id: Optional[str] = Field(None, description="Session ID for conversation continuity")
     user_preferences: Optional[Dict[str, Any]] = Field(
         default_factory=dict, 
         description="User preferences for response style, length, etc."
     )
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "question": "How many products do we have?",
-                "session_id": "abc123",
-                "user_preferences": {"response_detail": "balanced"}
-            }
-        }
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
 
 class ChatResponse(BaseModel):
     """Response model for chat interactions."""
@@ -37,21 +30,5 @@ class ChatResponse(BaseModel):
     suggested_followups: List[str] = Field(..., description="Suggested follow-up questions")
     clarification_needed: Optional[str] = Field(None, description="Clarification request if question is ambiguous")
     conversation_summary: str = Field(..., description="Summary of recent conversation")
-    timestamp: str = Field(..., description="Response timestamp")
-    
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "answer": "We have 77 products in our database.",
-                "confidence": 0.95,
-                "query_type_used": "SQL",
-                "session_id": "abc123",
-                "reasoning": "Question requires specific data count",
-                "sources": ["Northwind database"],
-                "sql_query": "SELECT COUNT(*) FROM Products",
-                "suggested_followups": ["What categories do we have?", "Show me top products"],
-                "clarification_needed": None,
-                "conversation_summary": "User asked about product count",
-                "timestamp": "2025-09-18T10:30:00Z"
-            }
-        }
\ No newline at end of file
+    interaction_id: Optional[int] = Field(None, description="Id of this turn in the session history, for feedback")
+    timestamp: datetime = Field(..., description="Response timestamp (UTC)")
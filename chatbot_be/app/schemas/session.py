@@ -3,51 +3,31 @@ Schemas for session management and feedback.
 Defines data structures for user sessions and feedback collection.
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any
 from datetime import datetime
 
 class SessionStatsResponse(BaseModel):
     """Response model for session statistics."""
     session_id: str = Field(..., description="Unique session identifier")
-    created_at: str = Field(..., description="Session creation timestamp")
-    last_activity: str = Field(..., description="Last activity timestamp")
+    created_at: datetime = Field(..., description="Session creation timestamp (UTC)")
+    last_activity: datetime = Field(..., description="Last activity timestamp (UTC)")
     total_interactions: int = Field(..., description="Total number of interactions")
     query_types_used: Dict[str, int] = Field(..., description="Count of each query type used")
     user_preferences: Dict[str, Any] = Field(..., description="User preferences for this session")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "session_id": "abc123",
-                "created_at": "2025-09-18T10:00:00Z",
-                "last_activity": "2025-09-18T10:30:00Z",
-                "total_interactions": 5,
-                "query_types_used": {"SQL": 3, "RAG": 2},
-                "user_preferences": {"response_detail": "balanced"}
-            }
-        }
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
 
 class FeedbackRequest(BaseModel):
     """Request model for user feedback on responses."""
     session_id: str = Field(..., description="Session ID for the interaction")
-    interaction_id: str = Field(..., description="Specific interaction being rated")
-    rating: int = Field(..., ge=1, le=5, description="Rating from 1 (poor) to 5 (excellent)")
+    interaction_id: int = Field(..., ge=0, description="Specific interaction being rated (interaction_id from the chat response)")
+    rating: int = Field(..., ge=1, le=5, description="Rating from 1 (poor) to 5 (excellent)", examples=[4])
     feedback_text: Optional[str] = Field(None, description="Optional text feedback")
     helpful: bool = Field(..., description="Whether the response was helpful")
     category: Optional[str] = Field(None, description="Category of feedback (accuracy, clarity, etc.)")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "session_id": "abc123",
-                "interaction_id": "int456",
-                "rating": 4,
-                "feedback_text": "Good answer but could be more detailed",
-                "helpful": True,
-                "category": "clarity"
-            }
-        }
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
 
 class FeedbackResponse(BaseModel):
     """Response model after submitting feedback."""
@@ -55,11 +35,4 @@ class FeedbackResponse(BaseModel):
     message: str = Field(..., description="Confirmation message")
     feedback_id: str = Field(..., description="Unique identifier for this feedback")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "success": True,
-                "message": "Thank you for your feedback!",
-                "feedback_id": "fb789"
-            }
-        }
\ No newline at end of file
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
@@ -4,14 +4,24 @@ Main orchestrator for conversational AI that combines session management,
 smart query routing, and context-aware responses.
 """
 
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any
 import asyncio
-from datetime import datetime
+import re
+from datetime import datetime, timezone
+import numpy as np
 
-from app.services.session_manager import SessionManager, ConversationSession, session_manager
-from app.services.query_router import QueryRouter, QueryType, query_router
+from app.services.session_manager import ConversationSession, session_manager
+from app.services.query_router import QueryType, query_router
 from app.services.rag_service import RAGService
-from app.services.sql_client import ask_sql_agent_sync
+from app.services.sql_client import ask_sql_agent
+from app.core.exceptions import RAGServiceInitializing
+
+# Pronouns and references that only make sense with earlier turns as context
+_AMBIGUOUS_RE = re.compile(r"\b(?:it|that|this|them|they|also|more)\b", re.IGNORECASE)
+# Any digit, to tell whether a SQL answer contains figures
+_DIGIT_RE = re.compile(r"\d")
+# Earlier turns at least this similar to an ambiguous question are added to its context
+_RELATED_TURN_MIN_SIMILARITY = 0.5
 
 class ConversationalResponse:
     """
@@ -30,6 +40,8 @@ class ConversationalResponse:
         self.suggested_followups: List[str] = []
         self.clarification_needed: Optional[str] = None
         self.conversation_summary: str = ""
+        self.cacheable: bool = True  # False when the answer is error text from a failed generation
+        self.interaction_id: Optional[int] = None  # Set once the turn is added to the session history
         
     def to_dict(self) -> Dict[str, Any]:
         """Convert response to dictionary for JSON serialization."""
@@ -44,7 +56,8 @@ class ConversationalResponse:
             "suggested_followups": self.suggested_followups,
             "clarification_needed": self.clarification_needed,
             "conversation_summary": self.conversation_summary,
-            "timestamp": datetime.now().isoformat()
+            "interaction_id": self.interaction_id,
+            "timestamp": datetime.now(timezone.utc)
         }
 
 class ConversationalService:
@@ -64,6 +77,13 @@ class ConversationalService:
         self.query_router = query_router
         self.rag_service = rag_service
         
+        # Handler per routed query type (CLARIFICATION is answered inline)
+        self._dispatch = {
+            QueryType.RAG: self._handle_rag_query,
+            QueryType.SQL: self._handle_sql_query,
+            QueryType.HYBRID: self._handle_hybrid_query
+        }
+        
         # Performance tracking
         self.query_stats = {
             "total_queries": 0,
@@ -96,15 +116,19 @@ class ConversationalService:
         response.session_id = session_id
         response.conversation_summary = session.get_conversation_summary()
         
-        # Clean up expired sessions periodically
+        # Clean up expired sessions periodically, after this request's current step
         if self.query_stats["total_queries"] % 10 == 0:
-            self.session_manager.cleanup_expired_sessions()
+            asyncio.get_running_loop().call_soon(self.session_manager.cleanup_expired_sessions)
+        
+        # Embed the question in a worker thread while the query is analyzed
+        embedding_task = asyncio.create_task(asyncio.to_thread(self._embed_question, question))
         
         try:
             # Analyze the query to determine best approach
             query_analysis = self.query_router.analyze_query(
                 question, 
-                session.current_context
+                session.current_context,
+                include_followups=True
             )
             
             response.reasoning = query_analysis["reasoning"]
@@ -118,21 +142,19 @@ class ConversationalService:
                 response.query_type_used = "CLARIFICATION"
                 self.query_stats["clarification_requests"] += 1
                 
+                # Nothing has awaited since the task was created, so cancelling keeps the embedding off the thread pool
+                embedding_task.cancel()
+                
                 # Don't add to session history yet - wait for clarification
                 return response
             
             # Route the query to appropriate processor(s)
-            if query_analysis["query_type"] == QueryType.RAG:
-                response = await self._handle_rag_query(question, session, query_analysis, response)
-                
-            elif query_analysis["query_type"] == QueryType.SQL:
-                response = await self._handle_sql_query(question, session, query_analysis, response)
-                
-            elif query_analysis["query_type"] == QueryType.HYBRID:
-                response = await self._handle_hybrid_query(question, session, query_analysis, response)
+            handler = self._dispatch.get(query_analysis["query_type"])
+            if handler is not None:
+                response = await handler(question, session, query_analysis, response, embedding_task)
             
             # Add interaction to session history
-            session.add_interaction(
+            response.interaction_id = session.add_interaction(
                 question=question,
                 answer=response.answer,
                 query_type=response.query_type_used,
@@ -141,7 +163,8 @@ class ConversationalService:
                     "sources": response.sources,
                     "sql_query": response.sql_query,
                     "entities": query_analysis["entities"]
-                }
+                },
+                question_embedding=await embedding_task
             )
             
             # Update statistics
@@ -149,6 +172,15 @@ class ConversationalService:
             
             return response
             
+        except RAGServiceInitializing as e:
+            # Not the user's fault; ask them to retry rather than rephrase
+            response.answer = e.message
+            response.confidence = 0.0
+            response.query_type_used = "ERROR"
+            response.reasoning = "Knowledge base is still loading"
+            
+            return response
+            
         except Exception as e:
             # Handle errors gracefully
             response.answer = f"I encountered an error while processing your question: {str(e)}. Could you please rephrase your question?"
@@ -158,35 +190,95 @@ class ConversationalService:
             
             return response
     
+    def is_context_dependent(self, question: str) -> bool:
+        """
+        Whether the answer to a question depends on the conversation so far; such questions are
+        rewritten with recent turns before answering, so their answers must not be reused.
+        """
+        return bool(_AMBIGUOUS_RE.search(question)) or self.query_router.is_followup(question)
+    
+    def response_cache_scope(self, session_id: Optional[str], question: str) -> Optional[str]:
+        """
+        Key under which a response to the question may be cached or reused: the session and the
+        topic it is answered under. None for context-dependent questions and unknown sessions.
+        """
+        if not session_id or self.is_context_dependent(question):
+            return None
+        session = self.session_manager.get_session(session_id)
+        if session is None:
+            return None
+        return f"{session_id}:{session.topic_for(question)}"
+    
+    def record_cached_turn(self, session_id: str, question: str, answer: str, query_type: str,
+                           sources: List[str], question_embedding: Optional[np.ndarray] = None) -> Optional[int]:
+        """
+        Record a turn answered from the response cache, so it still appears in the
+        session's history and keeps the session alive.
+        
+        Returns:
+            Optional[int]: Id of the recorded interaction, or None if the session no longer
+            exists (the cached answer should not be used)
+        """
+        session = self.session_manager.get_session(session_id)
+        if session is None:
+            return None
+        
+        interaction_id = session.add_interaction(
+            question=question,
+            answer=answer,
+            query_type=query_type,
+            metadata={"sources": sources, "cached": True},
+            question_embedding=question_embedding
+        )
+        self.query_stats["total_queries"] += 1
+        return interaction_id
+    
+    def _embed_question(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question for retrieval; None if the embedding model is unavailable."""
+        try:
+            return self.rag_service.vector_store.embed(question)
+        except Exception:
+            return None
+    
     async def _handle_rag_query(self, question: str, session: ConversationSession, 
-                               analysis: Dict[str, Any], response: ConversationalResponse) -> ConversationalResponse:
+                               analysis: Dict[str, Any], response: ConversationalResponse,
+                               embedding_task: Optional[asyncio.Task] = None) -> ConversationalResponse:
         """
         Handle questions that need vector search and contextual reasoning.
         """
         # Enhance question with conversation context if available
-        enhanced_question = self._enhance_question_with_context(question, session)
+        enhanced_question = await self._enhance_question_with_context(question, session, embedding_task)
+        
+        # The precomputed embedding only applies if the question wasn't rewritten
+        embedding = None
+        if embedding_task is not None and enhanced_question == question:
+            embedding = await embedding_task
         
         # Use RAG service to get answer
-        rag_answer = await self.rag_service.answer_question(enhanced_question)
+        rag_result = await self.rag_service.answer_question(
+            enhanced_question, session.current_context.get("topic"), embedding
+        )
         
-        response.answer = self._improve_rag_answer(rag_answer, session, analysis)
+        response.answer = self._improve_rag_answer(rag_result["answer"], session, analysis)
         response.query_type_used = "RAG"
-        response.sources = ["Vector search results"]  # Could be enhanced to show actual sources
+        response.sources = rag_result["context"]  # The retrieved documents the answer is based on
+        response.cacheable = not rag_result.get("failed", False)
         
         self.query_stats["rag_queries"] += 1
         
         return response
     
     async def _handle_sql_query(self, question: str, session: ConversationSession,
-                               analysis: Dict[str, Any], response: ConversationalResponse) -> ConversationalResponse:
+                               analysis: Dict[str, Any], response: ConversationalResponse,
+                               embedding_task: Optional[asyncio.Task] = None) -> ConversationalResponse:
         """
         Handle questions that need specific data from the database.
         """
         # Enhance question with context if needed
-        enhanced_question = self._enhance_question_with_context(question, session)
+        enhanced_question = await self._enhance_question_with_context(question, session, embedding_task)
         
-        # Use SQL agent function to get answer
-        sql_result = ask_sql_agent_sync(enhanced_question)
+        # Use SQL agent function to get answer; it runs on the agent's own threads
+        sql_result = await ask_sql_agent(enhanced_question)
         
         response.answer = self._improve_sql_answer(sql_result, session, analysis)
         response.query_type_used = "SQL"
@@ -198,13 +290,16 @@ class ConversationalService:
         return response
     
     async def _handle_hybrid_query(self, question: str, session: ConversationSession,
-                                  analysis: Dict[str, Any], response: ConversationalResponse) -> ConversationalResponse:
+                                  analysis: Dict[str, Any], response: ConversationalResponse,
+                                  embedding_task: Optional[asyncio.Task] = None) -> ConversationalResponse:
         """
         Handle complex questions that benefit from both RAG and SQL approaches.
         """
-        # Run both RAG and SQL in parallel for efficiency
-        rag_task = self.rag_service.answer_question(question)
-        sql_task = asyncio.create_task(asyncio.to_thread(ask_sql_agent_sync, question))
+        # Run both RAG and SQL in parallel for efficiency; the SQL agent starts before
+        # waiting on the embedding, which only the RAG side needs
+        sql_task = asyncio.create_task(ask_sql_agent(question))
+        embedding = await embedding_task if embedding_task is not None else None
+        rag_task = self.rag_service.answer_question(question, session.current_context.get("topic"), embedding)
         
         try:
             # Wait for both results with timeout
@@ -215,40 +310,55 @@ class ConversationalService:
             
             # Combine results intelligently
             combined_answer = self._combine_rag_sql_results(
-                rag_result, sql_result, question, analysis
+                rag_result["answer"], sql_result, question, analysis
             )
             
             response.answer = combined_answer
             response.query_type_used = "HYBRID"
-            response.sources = ["Vector search", "Database query"]
+            response.sources = rag_result["context"] + ["Database query"]
             response.sql_query = "SQL query executed"
+            response.cacheable = not rag_result.get("failed", False)
             
             self.query_stats["hybrid_queries"] += 1
             
         except asyncio.TimeoutError:
             # Fallback to RAG if hybrid processing takes too long
-            response.answer = await self.rag_service.answer_question(question)
+            rag_result = await self.rag_service.answer_question(question, embedding=embedding)
+            response.answer = rag_result["answer"]
             response.query_type_used = "RAG_FALLBACK"
-            response.sources = ["Vector search (fallback)"]
+            response.sources = rag_result["context"]
+            response.cacheable = not rag_result.get("failed", False)
             response.reasoning += " (Timeout occurred, used RAG fallback)"
         
         return response
     
-    def _enhance_question_with_context(self, question: str, session: ConversationSession) -> str:
+    async def _enhance_question_with_context(self, question: str, session: ConversationSession,
+                                             embedding_task: Optional[asyncio.Task] = None) -> str:
         """
         Enhance the user's question with relevant conversation context.
-        This helps provide better answers by including recent conversation history.
+        This helps provide better answers by including recent conversation history,
+        plus older turns that asked about something similar (see search_history()).
         """
         if not session.conversation_history:
             return question
         
-        # Get recent context
-        recent_context = session.get_conversation_summary(last_n=2)
-        
-        # If the question uses pronouns or references, include context
-        ambiguous_words = ["it", "that", "this", "them", "they", "also", "more"]
-        if any(word in question.lower() for word in ambiguous_words):
+        # If the question uses pronouns or references, include recent context
+        if _AMBIGUOUS_RE.search(question):
+            recent_context = session.get_conversation_summary(last_n=2)
             enhanced = f"Previous conversation:\n{recent_context}\n\nCurrent question: {question}"
+            
+            # The question's embedding is only awaited here, for questions that get rewritten
+            embedding = await embedding_task if embedding_task is not None else None
+            if embedding is not None:
+                # The last two turns are already in the summary
+                first_recent = session.turn_count - 2
+                related = [
+                    f"Q: {interaction['question']}\nA: {interaction['answer'][:200]}"
+                    for interaction, similarity in session.search_history(embedding, k=2)
+                    if interaction["id"] < first_recent and similarity >= _RELATED_TURN_MIN_SIMILARITY
+                ]
+                if related:
+                    enhanced = "Earlier related conversation:\n" + "\n\n".join(related) + "\n\n" + enhanced
             return enhanced
         
         return question
@@ -258,41 +368,40 @@ class ConversationalService:
         """
         Improve RAG answers by adding conversational elements and context.
         """
-        # Basic answer from RAG
-        improved_answer = rag_answer
-        
         # Add conversational tone
-        if session.conversation_history:
-            improved_answer = f"Building on our previous discussion, {rag_answer.lower()}"
+        parts = [
+            f"Building on our previous discussion, {rag_answer.lower()}"
+            if session.conversation_history else rag_answer
+        ]
         
         # Add entity-specific context if relevant
         entities = analysis.get("entities", [])
         if entities:
             entity_context = self._get_entity_context(entities)
             if entity_context:
-                improved_answer += f"\n\n{entity_context}"
+                parts.append(entity_context)
         
-        return improved_answer
+        return "\n\n".join(parts)
     
     def _improve_sql_answer(self, sql_answer: str, session: ConversationSession,
                            analysis: Dict[str, Any]) -> str:
         """
         Improve SQL answers by adding interpretation and context.
         """
-        improved_answer = sql_answer
+        parts = [sql_answer]
         
         # Add interpretation for numerical results
-        if any(char.isdigit() for char in sql_answer):
-            improved_answer += "\n\nLet me know if you'd like me to break down these numbers or explore related data!"
+        if _DIGIT_RE.search(sql_answer):
+            parts.append("Let me know if you'd like me to break down these numbers or explore related data!")
         
         # Suggest related queries based on entities
         entities = analysis.get("entities", [])
         if entities:
             suggestions = self._get_related_query_suggestions(entities)
             if suggestions:
-                improved_answer += f"\n\nYou might also be interested in: {', '.join(suggestions)}"
+                parts.append(f"You might also be interested in: {', '.join(suggestions)}")
         
-        return improved_answer
+        return "\n\n".join(parts)
     
     def _combine_rag_sql_results(self, rag_result: str, sql_result: str, 
                                 question: str, analysis: Dict[str, Any]) -> str:
@@ -300,16 +409,13 @@ class ConversationalService:
         Intelligently combine results from both RAG and SQL approaches.
         """
         # If SQL found specific data, lead with that
-        if sql_result and any(char.isdigit() for char in sql_result):
-            combined = f"Based on the database query: {sql_result}\n\n"
-            combined += f"For additional context: {rag_result}"
-        else:
-            # Lead with RAG for conceptual information
-            combined = f"{rag_result}\n\n"
-            if sql_result:
-                combined += f"From the database: {sql_result}"
-        
-        return combined
+        if sql_result and _DIGIT_RE.search(sql_result):
+            return f"Based on the database query: {sql_result}\n\nFor additional context: {rag_result}"
+        
+        # Lead with RAG for conceptual information
+        if sql_result:
+            return f"{rag_result}\n\nFrom the database: {sql_result}"
+        return f"{rag_result}\n\n"
     
     def _generate_clarification_response(self, analysis: Dict[str, Any], 
                                        session: ConversationSession) -> str:
@@ -320,15 +426,12 @@ class ConversationalService:
         
         # Add context from recent conversation if available
         if session.conversation_history:
-            recent_topics = [
-                interaction["metadata"].get("entities", []) 
-                for interaction in session.conversation_history[-2:]
-            ]
-            flat_topics = [topic for sublist in recent_topics for topic in sublist]
+            unique_topics: set[str] = set()
+            for interaction in session.recent_interactions(2):
+                unique_topics.update(interaction["metadata"].get("entities", ()))
             
-            if flat_topics:
-                unique_topics = list(set(flat_topics))
-                clarification += f"\n\nWe were recently discussing: {', '.join(unique_topics)}"
+            if unique_topics:
+                clarification += f"\n\nWe were recently discussing: {', '.join(sorted(unique_topics))}"
         
         return clarification
     
@@ -357,12 +460,12 @@ class ConversationalService:
             "employees": ["territory assignments", "sales performance", "team structure"]
         }
         
-        suggestions = []
-        for entity in entities:
-            if entity in suggestions_map:
-                suggestions.extend(suggestions_map[entity])
+        # Ordered de-duplication in one pass (repeated entities add nothing)
+        suggestions = dict.fromkeys(
+            suggestion for entity in entities for suggestion in suggestions_map.get(entity, ())
+        )
         
-        return suggestions[:3]  # Limit suggestions
+        return list(suggestions)[:3]  # Limit suggestions
     
     def get_session_statistics(self, session_id: str) -> Dict[str, Any]:
         """
@@ -376,11 +479,21 @@ class ConversationalService:
             "session_id": session_id,
             "created_at": session.created_at.isoformat(),
             "last_activity": session.last_activity.isoformat(),
-            "total_interactions": len(session.conversation_history),
+            "total_interactions": session.turn_count,
             "current_context": session.current_context,
             "conversation_summary": session.get_conversation_summary()
         }
     
+    def get_interaction(self, session_id: str, interaction_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Look up an interaction in a session's history.
+        Returns None if the session has expired or the interaction has rotated out.
+        """
+        session = self.session_manager.get_session(session_id)
+        if not session:
+            return None
+        return session.get_interaction(interaction_id)
+    
     def get_global_statistics(self) -> Dict[str, Any]:
         """
         Get overall system statistics.
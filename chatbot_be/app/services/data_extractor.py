@@ -4,18 +4,69 @@ Data extraction service for retrieving relevant information from the Northwind d
 Handles querying product descriptions, categories, and other data for RAG enhancement.
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 from app.models.database import database
 from app.core.exceptions import ChatbotBaseException
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Lookup queries as module constants: identical SQL text lets each pooled
+# connection reuse its cached prepared statement instead of re-planning
+PRODUCT_DESCRIPTIONS_SQL = """
+SELECT 
+    product_id,
+    product_name,
+    quantity_per_unit,
+    unit_price,
+    category_id,
+    supplier_id
+FROM products 
+LIMIT $1
+"""
+
+CATEGORY_BY_ID_SQL = """
+SELECT category_id, category_name, description
+FROM categories 
+WHERE category_id = $1
+"""
+
+CATEGORIES_BY_IDS_SQL = """
+SELECT category_id, category_name, description
+FROM categories 
+WHERE category_id = ANY($1::int[])
+"""
+
+SUPPLIER_BY_ID_SQL = """
+SELECT supplier_id, company_name, contact_name, city, country
+FROM suppliers 
+WHERE supplier_id = $1
+"""
+
+PRODUCTS_BY_NAME_SQL = """
+SELECT 
+    product_id,
+    product_name,
+    quantity_per_unit,
+    unit_price,
+    category_id
+FROM products 
+WHERE product_name ILIKE $1
+LIMIT $2
+"""
+
 class DataExtractor:
     """Service for extracting relevant data from the Northwind database for RAG."""
     
     def __init__(self):
         self.db = database
+        # Categories and suppliers are effectively static, so cache lookups by ID
+        self._category_cache = TTLCache(maxsize=1024, ttl=300)
+        self._supplier_cache = TTLCache(maxsize=1024, ttl=300)
+        # Repeat product searches from the UI are served without a round-trip
+        self._search_cache = TTLCache(maxsize=256, ttl=60)
     
     async def get_product_descriptions(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -28,32 +79,34 @@ class DataExtractor:
             List of product dictionaries with relevant information
         """
         try:
-            query = """
-            SELECT 
-                product_id,
-                product_name,
-                quantity_per_unit,
-                unit_price,
-                category_id,
-                supplier_id
-            FROM products 
-            LIMIT $1
-            """
-            
-            products = await self.db.execute_query(query, (limit,))
-            
-            # Enhance with category information
-            for product in products:
-                category_info = await self.get_category_info(product['category_id'])
-                product['category_name'] = category_info.get('category_name', 'Unknown')
-                product['category_description'] = category_info.get('description', '')
+            query = PRODUCT_DESCRIPTIONS_SQL
+            
+            rows = await self.db.fetch_records(query, (limit,))
+            
+            # Enhance with category information, fetched in one round-trip
+            categories = await self.get_categories_info(list({row['category_id'] for row in rows}))
+            
+            # Build each product dict once with known keys rather than converting and mutating
+            products = []
+            for row in rows:
+                category_info = categories.get(row['category_id'], {})
+                products.append({
+                    'product_id': row['product_id'],
+                    'product_name': row['product_name'],
+                    'quantity_per_unit': row['quantity_per_unit'],
+                    'unit_price': row['unit_price'],
+                    'category_id': row['category_id'],
+                    'supplier_id': row['supplier_id'],
+                    'category_name': category_info.get('category_name', 'Unknown'),
+                    'category_description': category_info.get('description', '')
+                })
             
             logger.info(f"Retrieved {len(products)} product descriptions")
             return products
             
-        except Exception as e:
+        except ChatbotBaseException as e:
             logger.error(f"Error fetching product descriptions: {str(e)}")
-            raise ChatbotBaseException(f"Failed to fetch product descriptions: {str(e)}")
+            raise ChatbotBaseException(f"Failed to fetch product descriptions: {str(e)}") from e
     
     async def get_category_info(self, category_id: int) -> Dict[str, Any]:
         """
@@ -65,20 +118,60 @@ class DataExtractor:
         Returns:
             Dictionary with category information
         """
+        cached = self._category_cache.get(category_id)
+        if cached is not None:
+            return cached
+        
         try:
-            query = """
-            SELECT category_id, category_name, description
-            FROM categories 
-            WHERE category_id = $1
-            """
+            query = CATEGORY_BY_ID_SQL
             
             results = await self.db.execute_query(query, (category_id,))
-            return results[0] if results else {}
+            if not results:
+                return {}
             
-        except Exception as e:
+            self._category_cache.set(category_id, results[0])
+            return results[0]
+            
+        except ChatbotBaseException as e:
             logger.error(f"Error fetching category info: {str(e)}")
             return {}
     
+    async def get_categories_info(self, category_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get category information for several IDs in a single query.
+        
+        Args:
+            category_ids: The category IDs to look up
+            
+        Returns:
+            Dictionary mapping category ID to category information
+        """
+        categories = {}
+        missing_ids = []
+        for category_id in category_ids:
+            cached = self._category_cache.get(category_id)
+            if cached is not None:
+                categories[category_id] = cached
+            else:
+                missing_ids.append(category_id)
+        
+        if not missing_ids:
+            return categories
+        
+        try:
+            query = CATEGORIES_BY_IDS_SQL
+            
+            results = await self.db.execute_query(query, (missing_ids,))
+            for row in results:
+                self._category_cache.set(row['category_id'], row)
+                categories[row['category_id']] = row
+            return categories
+            
+        except ChatbotBaseException as e:
+            logger.error(f"Error fetching category info: {str(e)}")
+            # Only the misses go without a category; the cached hits are still valid
+            return categories
+    
     async def get_supplier_info(self, supplier_id: int) -> Dict[str, Any]:
         """
         Get supplier information by ID.
@@ -89,17 +182,21 @@ class DataExtractor:
         Returns:
             Dictionary with supplier information
         """
+        cached = self._supplier_cache.get(supplier_id)
+        if cached is not None:
+            return cached
+        
         try:
-            query = """
-            SELECT supplier_id, company_name, contact_name, city, country
-            FROM suppliers 
-            WHERE supplier_id = $1
-            """
+            query = SUPPLIER_BY_ID_SQL
             
             results = await self.db.execute_query(query, (supplier_id,))
-            return results[0] if results else {}
+            if not results:
+                return {}
+            
+            self._supplier_cache.set(supplier_id, results[0])
+            return results[0]
             
-        except Exception as e:
+        except ChatbotBaseException as e:
             logger.error(f"Error fetching supplier info: {str(e)}")
             return {}
     
@@ -114,28 +211,26 @@ class DataExtractor:
         Returns:
             List of matching products
         """
+        # ILIKE is case-insensitive, so normalized terms share a cache entry
+        search_term = search_term.strip()
+        cache_key = (search_term.lower(), limit)
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            query = """
-            SELECT 
-                product_id,
-                product_name,
-                quantity_per_unit,
-                unit_price,
-                category_id
-            FROM products 
-            WHERE product_name ILIKE $1
-            LIMIT $2
-            """
+            query = PRODUCTS_BY_NAME_SQL
             
             search_pattern = f"%{search_term}%"
             results = await self.db.execute_query(query, (search_pattern, limit))
             
             logger.info(f"Found {len(results)} products matching '{search_term}'")
+            self._search_cache.set(cache_key, results)
             return results
             
-        except Exception as e:
+        except ChatbotBaseException as e:
             logger.error(f"Error searching products: {str(e)}")
-            raise ChatbotBaseException(f"Failed to search products: {str(e)}")
+            raise ChatbotBaseException(f"Failed to search products: {str(e)}") from e
     
     async def get_database_schema(self) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -146,44 +241,17 @@ class DataExtractor:
         """
         try:
             tables = await self.db.get_all_tables()
-            schema_info = {}
             
-            for table_name in tables:
-                schema_info[table_name] = await self.db.get_table_schema(table_name)
+            # Fetch table schemas concurrently; the pool caps how many run at once
+            schemas = await asyncio.gather(*(self.db.get_table_schema(table_name) for table_name in tables))
+            schema_info = dict(zip(tables, schemas))
             
             logger.info(f"Retrieved schema for {len(tables)} tables")
             return schema_info
             
-        except Exception as e:
+        except ChatbotBaseException as e:
             logger.error(f"Error fetching database schema: {str(e)}")
-            raise ChatbotBaseException(f"Failed to fetch database schema: {str(e)}")
+            raise ChatbotBaseException(f"Failed to fetch database schema: {str(e)}") from e
 
 # Global data extractor instance
 data_extractor = DataExtractor()
-
-from typing import List
-from app.models.database import database
-
-async def fetch_product_descriptions() -> List[str]:
-    """
-    Fetch product descriptions from the Northwind database.
-    Returns:
-        List[str]: List of product descriptions.
-    """
-    try:
-        # SQLite query for product descriptions
-        query = """
-        SELECT ProductName || ': ' || COALESCE(QuantityPerUnit, '') AS description 
-        FROM Products
-        """
-        results = database.execute_query(query)
-        return [row['description'] for row in results]
-        
-    except Exception as e:
-        print(f"Error fetching product descriptions: {e}")
-        # Return some sample data if database fails
-        return [
-            "Sample Product 1: High quality item",
-            "Sample Product 2: Premium service", 
-            "Sample Product 3: Reliable solution"
-        ]
@@ -0,0 +1,71 @@
+"""
+embedding_cache.py
+Redis-backed cache of text embeddings, shared across restarts and workers.
+Vectors are keyed by a truncated SHA-256 of the text, so an unchanged
+corpus is re-indexed without running the embedding model again.
+"""
+
+import hashlib
+import logging
+from typing import List, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # optional dependency; embeddings are then computed every time
+    redis = None
+
+class EmbeddingCache:
+    """
+    Stores float32 embeddings in Redis under "emb:<namespace>:<hash>".
+    Redis failures are logged and treated as cache misses, never raised.
+    """
+
+    def __init__(self, redis_url: Optional[str], namespace: str, ttl_seconds: int = 7 * 24 * 3600):
+        """
+        Args:
+            redis_url: Redis connection URL; None disables the cache
+            namespace: Key prefix identifying the model, so vectors from
+                different models or backends never mix
+            ttl_seconds: Expiry for stored embeddings
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed; embedding cache disabled")
+            else:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+    @property
+    def enabled(self) -> bool:
+        return self._redis is not None
+
+    def _key(self, text: str) -> str:
+        return f"emb:{self.namespace}:{hashlib.sha256(text.encode()).digest()[:16].hex()}"
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up embeddings for texts in one MGET; missing entries are None."""
+        if self._redis is None or not texts:
+            return [None] * len(texts)
+        try:
+            values = self._redis.mget([self._key(text) for text in texts])
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Embedding cache lookup failed: {str(e)}")
+            return [None] * len(texts)
+        return [None if value is None else np.frombuffer(value, dtype=np.float32) for value in values]
+
+    def set_many(self, texts: Sequence[str], embeddings: np.ndarray) -> None:
+        """Store embeddings for texts in one pipelined round-trip."""
+        if self._redis is None or not texts:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for text, embedding in zip(texts, embeddings):
+                pipe.set(self._key(text), np.asarray(embedding, dtype=np.float32).tobytes(), ex=self.ttl_seconds)
+            pipe.execute()
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Embedding cache update failed: {str(e)}")
@@ -3,8 +3,28 @@ llm_client.py
 Service to interact with DeepSeek LLM via Ollama's local API.
 """
 
+import logging
+import orjson
 import httpx
-from typing import List
+from typing import AsyncIterator, List
+from app.core.config import settings
+from app.core.exceptions import LLMException
+
+logger = logging.getLogger(__name__)
+
+# Fixed prompt prefix, with explicit instructions for counting; identical bytes
+# on every call also let Ollama reuse its cached prefix
+_INSTRUCTIONS = (
+    "You are a helpful assistant. "
+    "Based on the context below, answer the user's question. "
+    "If the user asks for a count, count the number of items in the context. "
+    "If the user asks for a list, list the items. "
+    "If the user asks for details, provide details from the context. "
+)
+
+# No read timeout, since tokens may be spaced out while the model generates; connecting
+# and sending still time out so an unreachable Ollama host fails instead of hanging
+_STREAM_TIMEOUT = httpx.Timeout(connect=5.0, read=None, write=10.0, pool=5.0)
 
 class DeepSeekLLMClient:
     """
@@ -13,6 +33,22 @@ class DeepSeekLLMClient:
     def __init__(self, base_url: str = "http://localhost:11434/api/generate", model: str = "deepseek-coder"):
         self.base_url = base_url
         self.model = model
+        # Shared client keeps connections to Ollama alive between calls
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0),
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool."""
+        await self._client.aclose()
+
+    def _build_prompt(self, prompt: str, context: List[str] = None) -> str:
+        """Combine context documents and the user question into a single prompt."""
+        if context:
+            context_text = "\n".join("- " + doc for doc in context)
+            return f"{_INSTRUCTIONS}\n\nContext:\n{context_text}\n\nQuestion: {prompt}\nAnswer:"
+        return prompt
 
     async def generate(self, prompt: str, context: List[str] = None) -> str:
         """
@@ -22,43 +58,61 @@ class DeepSeekLLMClient:
             context (List[str], optional): Context documents to include
         Returns:
             str: Generated answer
+        Raises:
+            LLMException: If Ollama is unreachable or returns an error
         """
-        # Combine context and prompt
-        if context:
-            context_text = "\n".join([f"- {doc}" for doc in context])
-            # Add explicit instructions for counting
-            instructions = (
-                "You are a helpful assistant. "
-                "Based on the context below, answer the user's question. "
-                "If the user asks for a count, count the number of items in the context. "
-                "If the user asks for a list, list the items. "
-                "If the user asks for details, provide details from the context. "
-            )
-            full_prompt = f"{instructions}\n\nContext:\n{context_text}\n\nQuestion: {prompt}\nAnswer:"
-        else:
-            full_prompt = prompt
+        # Consume Ollama's token stream rather than waiting for one buffered body
+        chunks = [chunk async for chunk in self._stream_tokens(prompt, context)]
+        return "".join(chunks) or "No answer generated."
 
+    async def generate_stream(self, prompt: str, context: List[str] = None) -> AsyncIterator[str]:
+        """
+        Stream a response from DeepSeek LLM token by token.
+        Errors are yielded as text, since part of the answer may already have been sent.
+        Args:
+            prompt (str): The user question
+            context (List[str], optional): Context documents to include
+        Yields:
+            str: Generated text fragments
+        """
+        try:
+            async for token in self._stream_tokens(prompt, context):
+                yield token
+        except LLMException as e:
+            yield e.message
+
+    async def _stream_tokens(self, prompt: str, context: List[str] = None) -> AsyncIterator[str]:
+        """
+        Yield generated text fragments; Ollama emits one JSON object per line until "done" is true.
+        Raises:
+            LLMException: If Ollama is unreachable or returns an error
+        """
         payload = {
             "model": self.model,
-            "prompt": full_prompt,
-            "stream": False
+            "prompt": self._build_prompt(prompt, context),
+            "stream": True
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(self.base_url, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                print(data)
-                return data.get("response", "No answer generated.")
-            except httpx.HTTPStatusError as e:
-                # Log status code and response text
-                return f"HTTP error {e.response.status_code}: {e.response.text}"
-            except httpx.RequestError as e:
-                # Log request error details
-                return f"Request error: {str(e)}"
-            except Exception as e:
-                # Log any other error
-                return f"Unexpected error calling DeepSeek LLM: {str(e)}"
+        try:
+            async with self._client.stream("POST", self.base_url, json=payload, timeout=_STREAM_TIMEOUT) as response:
+                if response.status_code >= 400:
+                    body = await response.aread()
+                    raise LLMException(f"HTTP error {response.status_code}: {body.decode(errors='replace')}")
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("ollama response keys=%s", list(chunk))
+                        break
+        except LLMException:
+            raise
+        except httpx.RequestError as e:
+            raise LLMException(f"Request error: {str(e)}") from e
+        except Exception as e:
+            raise LLMException(f"Unexpected error calling DeepSeek LLM: {str(e)}") from e
 
 # Global instance for reuse
-llm_client = DeepSeekLLMClient()
+llm_client = DeepSeekLLMClient(f"{settings.ollama_base_url}/api/generate", settings.rag_llm_model)
@@ -6,12 +6,30 @@ Intelligently determines the best approach for answering user questions:
 - Hybrid: For complex questions requiring both approaches
 """
 
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, FrozenSet, List, Optional, Tuple, Any
+import copy
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from enum import Enum
 
-class QueryType(Enum):
-    """Enumeration of different query processing approaches."""
+import ahocorasick
+
+# A run of punctuation and/or whitespace collapses to a single space
+_NON_WORD_RUN = re.compile(r'\W+')
+_NUMBER = re.compile(r'\b\d+\b')
+
+@dataclass(frozen=True, slots=True)
+class ParsedQuery:
+    """A question normalized once and shared by all routing helpers."""
+    lower: str                     # lowercased, stripped question
+    clean: str                     # punctuation/whitespace runs collapsed to single spaces
+    tokens: Tuple[str, ...]
+    token_set: FrozenSet[str]
+    matched_keywords: FrozenSet[str]  # indicator/entity keywords found anywhere in `clean`
+
+class QueryType(str, Enum):
+    """Enumeration of different query processing approaches (serializes as its value)."""
     RAG = "RAG"              # Vector search with LLM reasoning
     SQL = "SQL"              # Direct database queries
     HYBRID = "HYBRID"        # Combination of both approaches
@@ -23,6 +41,12 @@ class QueryRouter:
     Uses pattern matching and keyword analysis to route queries intelligently.
     """
     
+    # Whole-word markers, checked against the question's token set
+    _CLARIFICATION_WORDS = frozenset({"it", "that", "this", "them", "those", "these"})  # Ambiguous references
+    _FOLLOWUP_WORDS = frozenset({"also", "and", "more", "additionally", "furthermore"})
+    _SQL_QUESTION_WORDS = frozenset({"which", "where", "when", "who"})
+    _RAG_QUESTION_WORDS = frozenset({"what", "how", "why"})
+    
     def __init__(self):
         # Keywords that typically indicate SQL queries (specific data requests)
         self.sql_indicators = [
@@ -51,11 +75,6 @@ class QueryRouter:
             "recommend", "suggest", "advice", "should i", "best", "better", "ideal"
         ]
         
-        # Keywords that might require clarification
-        self.clarification_indicators = [
-            "it", "that", "this", "them", "those", "these"  # Ambiguous references
-        ]
-        
         # Database entity keywords (help identify what data we're dealing with)
         self.entity_keywords = {
             "products": ["product", "item", "food", "beverage", "category", "supplier"],
@@ -64,14 +83,35 @@ class QueryRouter:
             "employees": ["employee", "staff", "worker", "manager"],
             "regions": ["region", "territory", "area", "location", "country", "city"]
         }
+        
+        # One automaton over every scoring/entity keyword, so a question is scanned once
+        self._keyword_automaton = ahocorasick.Automaton()
+        keywords = self.sql_indicators + self.rag_indicators + [
+            keyword for entity_keywords in self.entity_keywords.values() for keyword in entity_keywords
+        ]
+        for keyword in keywords:
+            self._keyword_automaton.add_word(keyword, keyword)
+        self._keyword_automaton.make_automaton()
+        
+        # Reverse lookup so entity detection only visits the keywords actually found
+        self._keyword_entity = {
+            keyword: entity_type
+            for entity_type, entity_keywords in self.entity_keywords.items()
+            for keyword in entity_keywords
+        }
+        
+        # Routing only depends on the question and a few context fields, so memoize it
+        self._analyze_cached = lru_cache(maxsize=4096)(self._analyze_uncached)
     
-    def analyze_query(self, question: str, session_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def analyze_query(self, question: str, session_context: Optional[Dict[str, Any]] = None,
+                      include_followups: bool = False) -> Dict[str, Any]:
         """
         Analyze a user question and determine the best processing approach.
         
         Args:
             question: The user's question
             session_context: Optional conversation context from current session
+            include_followups: Whether to fill in suggested_followups (left empty otherwise)
             
         Returns:
             Dict containing:
@@ -81,11 +121,31 @@ class QueryRouter:
             - entities: List of detected entities (products, customers, etc.)
             - clarification_needed: Optional clarification questions
         """
-        question_lower = question.lower().strip()
+        if session_context:
+            analysis = self._analyze_cached(
+                question, True, session_context.get("topic"), session_context.get("last_query_type")
+            )
+        else:
+            analysis = self._analyze_cached(question, False, None, None)
+        # Callers may mutate the result, so hand out a copy of the cached dict
+        analysis = copy.deepcopy(analysis)
         
-        # Clean the question (remove extra spaces, punctuation for analysis)
-        clean_question = re.sub(r'[^\w\s]', ' ', question_lower)
-        clean_question = re.sub(r'\s+', ' ', clean_question)
+        # Generate suggested follow-up questions only when asked for
+        if include_followups and analysis["query_type"] != QueryType.CLARIFICATION:
+            analysis["suggested_followups"] = self._generate_followups(analysis)
+        
+        return analysis
+    
+    def is_followup(self, question: str) -> bool:
+        """Whether the question leans on earlier turns (pronouns or follow-up words like "more")."""
+        tokens = frozenset(_NON_WORD_RUN.sub(' ', question.lower()).split())
+        return bool(tokens & (self._CLARIFICATION_WORDS | self._FOLLOWUP_WORDS))
+    
+    def _analyze_uncached(self, question: str, has_context: bool,
+                          topic: Optional[str], last_query_type: Optional[str]) -> Dict[str, Any]:
+        """Route a question given only the context fields routing depends on."""
+        session_context = {"topic": topic, "last_query_type": last_query_type} if has_context else None
+        pq = self._parse(question)
         
         # Initialize analysis result
         analysis = {
@@ -99,25 +159,25 @@ class QueryRouter:
         }
         
         # Detect entities in the question
-        detected_entities = self._detect_entities(clean_question)
+        detected_entities = self._detect_entities(pq)
         analysis["entities"] = detected_entities
         
         # Check for ambiguous references that might need clarification
-        if self._needs_clarification(question_lower, session_context):
+        if self._needs_clarification(pq, session_context):
             analysis["query_type"] = QueryType.CLARIFICATION
             analysis["confidence"] = 0.8
             analysis["reasoning"] = "Question contains ambiguous references that need clarification"
-            analysis["clarification_needed"] = self._generate_clarification(question_lower, session_context)
+            analysis["clarification_needed"] = self._generate_clarification(pq, session_context)
             return analysis
         
         # Score the question for different query types
-        sql_score = self._calculate_sql_score(clean_question)
-        rag_score = self._calculate_rag_score(clean_question)
+        sql_score = self._calculate_sql_score(pq)
+        rag_score = self._calculate_rag_score(pq)
         
         # Consider session context if available
         if session_context:
             sql_score, rag_score = self._adjust_scores_with_context(
-                sql_score, rag_score, session_context, clean_question
+                sql_score, rag_score, session_context, pq
             )
         
         # Determine query type based on scores
@@ -139,22 +199,33 @@ class QueryRouter:
             analysis["confidence"] = 0.5
             analysis["reasoning"] = "Unclear intent, defaulting to contextual search"
         
-        # Generate suggested follow-up questions
-        analysis["suggested_followups"] = self._generate_followups(analysis)
-        
         return analysis
     
-    def _detect_entities(self, question: str) -> List[str]:
-        """Detect which database entities (tables/concepts) the question refers to."""
-        entities = []
+    def _parse(self, question: str) -> ParsedQuery:
+        """Normalize the question and find its keywords in one pass."""
+        question_lower = question.lower().strip()
         
-        for entity_type, keywords in self.entity_keywords.items():
-            if any(keyword in question for keyword in keywords):
-                entities.append(entity_type)
+        # Clean the question (remove extra spaces, punctuation for analysis)
+        clean_question = _NON_WORD_RUN.sub(' ', question_lower)
+        tokens = tuple(clean_question.split())
+        
+        return ParsedQuery(
+            lower=question_lower,
+            clean=clean_question,
+            tokens=tokens,
+            token_set=frozenset(tokens),
+            # Every keyword occurring in the question, from a single automaton walk
+            matched_keywords=frozenset(keyword for _, keyword in self._keyword_automaton.iter(clean_question))
+        )
+    
+    def _detect_entities(self, pq: ParsedQuery) -> List[str]:
+        """Detect which database entities (tables/concepts) the question refers to."""
+        found = {self._keyword_entity[keyword] for keyword in pq.matched_keywords if keyword in self._keyword_entity}
         
-        return entities
+        # Report entities in their declared order
+        return [entity_type for entity_type in self.entity_keywords if entity_type in found]
     
-    def _calculate_sql_score(self, question: str) -> float:
+    def _calculate_sql_score(self, pq: ParsedQuery) -> float:
         """Calculate how likely this question needs SQL processing."""
         score = 0.0
         total_indicators = len(self.sql_indicators)
@@ -162,7 +233,7 @@ class QueryRouter:
         # Check for SQL indicator keywords
         matches = 0
         for indicator in self.sql_indicators:
-            if indicator in question:
+            if indicator in pq.matched_keywords:
                 matches += 1
                 # Give higher weight to certain patterns
                 if indicator in ["how many", "count", "total"]:
@@ -177,25 +248,23 @@ class QueryRouter:
             score *= 1.2
         
         # Check for number patterns (likely requesting counts/calculations)
-        if re.search(r'\b\d+\b', question):
+        if _NUMBER.search(pq.clean):
             score += 0.1
         
         # Look for question words that typically need specific data
-        sql_question_words = ["which", "where", "when", "who"]
-        for word in sql_question_words:
-            if question.startswith(word):
-                score += 0.15
+        if pq.tokens and pq.tokens[0] in self._SQL_QUESTION_WORDS:
+            score += 0.15
         
         return min(score, 1.0)  # Cap at 1.0
     
-    def _calculate_rag_score(self, question: str) -> float:
+    def _calculate_rag_score(self, pq: ParsedQuery) -> float:
         """Calculate how likely this question needs RAG processing."""
         score = 0.0
         
         # Check for RAG indicator keywords
         matches = 0
         for indicator in self.rag_indicators:
-            if indicator in question:
+            if indicator in pq.matched_keywords:
                 matches += 1
                 # Give higher weight to certain patterns
                 if indicator in ["what is", "explain", "describe"]:
@@ -210,30 +279,26 @@ class QueryRouter:
             score *= 1.2
         
         # Questions starting with "what", "how", "why" often need context
-        rag_question_words = ["what", "how", "why"]
-        for word in rag_question_words:
-            if question.startswith(word):
-                score += 0.2
+        if pq.tokens and pq.tokens[0] in self._RAG_QUESTION_WORDS:
+            score += 0.2
         
         # Long questions often need more context
-        if len(question.split()) > 10:
+        if len(pq.tokens) > 10:
             score += 0.1
         
         return min(score, 1.0)  # Cap at 1.0
     
-    def _needs_clarification(self, question: str, session_context: Optional[Dict[str, Any]]) -> bool:
+    def _needs_clarification(self, pq: ParsedQuery, session_context: Optional[Dict[str, Any]]) -> bool:
         """Check if the question contains ambiguous references that need clarification."""
-        # Check for pronouns without clear antecedents
-        for indicator in self.clarification_indicators:
-            if question.startswith(indicator) or f" {indicator} " in question:
-                # If there's no recent context, we need clarification
-                if not session_context or not session_context.get("topic"):
-                    return True
+        # Pronouns without clear antecedents need clarification if there's no recent context
+        if pq.token_set & self._CLARIFICATION_WORDS:
+            return not session_context or not session_context.get("topic")
         
         return False
     
-    def _generate_clarification(self, question: str, session_context: Optional[Dict[str, Any]]) -> str:
+    def _generate_clarification(self, pq: ParsedQuery, session_context: Optional[Dict[str, Any]]) -> str:
         """Generate a clarification question for ambiguous queries."""
+        question = pq.lower
         if question.startswith(("it", "that", "this")):
             return "I'm not sure what you're referring to. Could you be more specific about what you'd like to know?"
         elif question.startswith(("them", "those", "these")):
@@ -242,7 +307,7 @@ class QueryRouter:
             return "Could you provide more details about what you're looking for?"
     
     def _adjust_scores_with_context(self, sql_score: float, rag_score: float, 
-                                  session_context: Dict[str, Any], question: str) -> Tuple[float, float]:
+                                  session_context: Dict[str, Any], pq: ParsedQuery) -> Tuple[float, float]:
         """Adjust routing scores based on conversation context."""
         # If user was just doing SQL queries, slightly favor SQL for follow-ups
         if session_context.get("last_query_type") == "SQL":
@@ -253,8 +318,7 @@ class QueryRouter:
             rag_score *= 1.1
         
         # If the question is a follow-up (contains "also", "and", "more")
-        followup_words = ["also", "and", "more", "additionally", "furthermore"]
-        if any(word in question for word in followup_words):
+        if pq.token_set & self._FOLLOWUP_WORDS:
             # Maintain the same query type as previous
             last_type = session_context.get("last_query_type")
             if last_type == "SQL":
@@ -4,23 +4,26 @@ Script to extract data, embed, and build the FAISS vector store for RAG.
 """
 
 import asyncio
-from chatbot_be.rag.data_extractor import fetch_product_descriptions
-from chatbot_be.rag.vector_store import VectorStore
+from app.services.rag_service import build_product_descriptions
+from app.services.vector_store import VectorStore
+from app.core.config import settings
 
 async def build_rag_index():
     """
     Extracts product descriptions, generates embeddings, and builds the FAISS index.
     """
     print("Extracting product descriptions from database...")
-    descriptions = await fetch_product_descriptions()
+    # The same corpus RAGService.initialize indexes, so both hash to the same on-disk index
+    descriptions = await build_product_descriptions()
     print(f"Fetched {len(descriptions)} descriptions.")
 
     print("Building vector store with embeddings...")
     vs = VectorStore()
-    vs.build_index(descriptions)
-    print("Vector store built and ready for retrieval!")
-    # Optionally, save the index to disk for reuse
-    # faiss.write_index(vs.index, "vector.index")
+    # Same on-disk index as RAGService.initialize, so the API starts without rebuilding
+    if vs.load_or_build(descriptions, settings.vector_store_path):
+        print(f"Existing index in {settings.vector_store_path} is up to date.")
+    else:
+        print(f"Vector store built and saved to {settings.vector_store_path}!")
 
 if __name__ == "__main__":
     asyncio.run(build_rag_index())
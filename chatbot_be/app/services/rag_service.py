@@ -3,13 +3,45 @@ rag_service.py
 Service that combines vector search with LLM to answer questions using RAG.
 """
 
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional
+from operator import itemgetter
 import asyncio
+import logging
+import numpy as np
 from app.services.data_extractor import data_extractor
 from app.services.vector_store import VectorStore
 from app.services.llm_client import llm_client
-from app.core.exceptions import RAGServiceException
+from app.services.semantic_cache import SemanticChatCache
+from app.core.exceptions import RAGServiceInitializing
 from app.core.config import settings
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Indexed when the database has no products, or cannot be reached at startup
+FALLBACK_DESCRIPTIONS = [
+    "Product: Sample Product 1 - Category: Electronics - Price: $99.99 - Description: High-quality electronic device",
+    "Product: Sample Product 2 - Category: Books - Price: $19.99 - Description: Educational book for learning",
+    "Product: Sample Product 3 - Category: Clothing - Price: $49.99 - Description: Comfortable casual wear"
+]
+
+async def build_product_descriptions() -> List[str]:
+    """
+    Build the product texts the RAG index is built from.
+    Shared by RAGService.initialize and rag_pipeline, so both produce the same
+    corpus hash and reuse one on-disk index.
+    """
+    product_data = await data_extractor.get_product_descriptions()
+    
+    # Convert product dictionaries to readable text strings for embedding
+    product_fields = itemgetter('product_name', 'category_name', 'unit_price', 'category_description')
+    descriptions = [
+        f"Product: {name} - Category: {category} - Price: ${price} - Description: {description}"
+        for name, category, price, description in map(product_fields, product_data)
+    ]
+    
+    # Add some fallback descriptions if database is empty
+    return descriptions or list(FALLBACK_DESCRIPTIONS)
 
 class RAGService:
     """
@@ -19,123 +51,162 @@ class RAGService:
     def __init__(self):
         self.vector_store = VectorStore()
         self.is_initialized = False
+        # Set once the index is ready; initialize() runs in the background at startup
+        self._ready = asyncio.Event()
+        self._init_lock = asyncio.Lock()
+        # Reuses answers for repeated or near-identical questions, skipping retrieval and the LLM
+        self.answer_cache: Optional[SemanticChatCache] = SemanticChatCache(
+            self.vector_store,
+            threshold=settings.answer_cache_threshold,
+            ttl_seconds=settings.session_timeout_minutes * 60
+        ) if settings.semantic_cache_enabled else None
+        # (index version, query, top_k) -> retrieved documents; repeats skip the vector search
+        self._context_cache = TTLCache(maxsize=2048, ttl=settings.session_timeout_minutes * 60)
     
     async def initialize(self):
         """
         Initialize the RAG service by building the vector store.
-        This should be called once at startup.
+        This should be called once at startup; concurrent or repeated calls are no-ops.
         """
-        if not self.is_initialized:
-            print("Initializing RAG service...")
+        async with self._init_lock:
+            if self.is_initialized:
+                return
+            logger.info("Initializing RAG service...")
             try:
-                product_data = await data_extractor.get_product_descriptions()
+                descriptions = await build_product_descriptions()
                 
-                # Convert product dictionaries to text strings for embedding
-                descriptions = []
-                for product in product_data:
-                    # Format product information as readable text
-                    text = f"Product: {product.get('product_name', 'Unknown')} - "
-                    text += f"Category: {product.get('category_name', 'Unknown')} - "
-                    text += f"Price: ${product.get('unit_price', 0)} - "
-                    text += f"Description: {product.get('category_description', 'No description available')}"
-                    descriptions.append(text)
-                
-                # Add some fallback descriptions if database is empty
-                if not descriptions:
-                    descriptions = [
-                        "Product: Sample Product 1 - Category: Electronics - Price: $99.99 - Description: High-quality electronic device",
-                        "Product: Sample Product 2 - Category: Books - Price: $19.99 - Description: Educational book for learning",
-                        "Product: Sample Product 3 - Category: Clothing - Price: $49.99 - Description: Comfortable casual wear"
-                    ]
-                
-                self.vector_store.build_index(descriptions)
+                # Reuse the on-disk index when the corpus hasn't changed since it was built
+                await asyncio.to_thread(self.vector_store.load_or_build, descriptions, settings.vector_store_path)
                 self.is_initialized = True
-                print(f"RAG service initialized with {len(descriptions)} documents.")
+                self._ready.set()
+                logger.info(f"RAG service initialized with {len(descriptions)} documents.")
                 
             except Exception as e:
-                print(f"Error initializing RAG service: {str(e)}")
+                logger.error(f"Error initializing RAG service: {str(e)}")
                 # Use fallback descriptions
-                fallback_descriptions = [
-                    "Product: Sample Product 1 - Category: Electronics - Price: $99.99 - Description: High-quality electronic device",
-                    "Product: Sample Product 2 - Category: Books - Price: $19.99 - Description: Educational book for learning",
-                    "Product: Sample Product 3 - Category: Clothing - Price: $49.99 - Description: Comfortable casual wear"
-                ]
-                self.vector_store.build_index(fallback_descriptions)
+                await asyncio.to_thread(self.vector_store.build_index, list(FALLBACK_DESCRIPTIONS))
                 self.is_initialized = True
-                print(f"RAG service initialized with {len(fallback_descriptions)} fallback documents.")
+                self._ready.set()
+                logger.info(f"RAG service initialized with {len(FALLBACK_DESCRIPTIONS)} fallback documents.")
     
-    async def search_context(self, query: str, top_k: int = 3) -> List[str]:
+    async def wait_ready(self, timeout: float = 0.1) -> None:
+        """
+        Wait briefly for background initialization to finish.
+        
+        Raises:
+            RAGServiceInitializing: If the index is still being built after timeout seconds
+        """
+        if self._ready.is_set():
+            return
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise RAGServiceInitializing("The product knowledge base is still loading, please try again shortly")
+    
+    async def search_context(self, query: str, top_k: int = 3,
+                             embedding: Optional[np.ndarray] = None) -> List[str]:
         """
         Search for relevant context from the vector store.
         
         Args:
             query (str): User's question
             top_k (int): Number of relevant documents to retrieve
+            embedding (Optional[np.ndarray]): Precomputed query embedding, if already available
             
         Returns:
             List[str]: List of relevant context documents
         """
-        if not self.is_initialized:
-            await self.initialize()
+        await self.wait_ready()
+        
+        key = (self.vector_store.index_version, query, top_k)
+        cached = self._context_cache.get(key)
+        if cached is not None:
+            return list(cached)
         
-        results = self.vector_store.search(query, top_k)
+        if embedding is None:
+            results = self.vector_store.search(query, top_k)
+        else:
+            results = self.vector_store.search_with_embedding(embedding, top_k)
         # Extract just the text content (ignore scores for now)
         context_docs = [result[0] for result in results]
+        self._context_cache.set(key, tuple(context_docs))
         return context_docs
     
-    async def answer_question(self, question: str) -> Dict[str, Any]:
+    async def generate_answer(self, question: str, context_docs: List[str]) -> str:
         """
-        Answer a question using RAG approach with DeepSeek LLM.
+        Generate an answer from already retrieved context documents.
         
         Args:
             question (str): User's question
+            context_docs (List[str]): Retrieved context documents
+            
         Returns:
-            Dict[str, Any]: Contains the answer and retrieved context
+            str: Generated answer
         """
-        # Step 1: Retrieve relevant context
-        context_docs = await self.search_context(question, top_k=3)
-        
-        # Step 2: Generate answer using DeepSeek LLM
         try:
-            answer = await llm_client.generate(question, context_docs)
+            return await llm_client.generate(question, context_docs)
         except Exception as e:
-            answer = f"Error generating answer with DeepSeek LLM: {str(e)}"
-        
-        return {
-            "question": question,
-            "answer": answer,
-            "context": context_docs,
-            "context_count": len(context_docs)
-        }
+            return f"Error generating answer with DeepSeek LLM: {str(e)}"
     
-    def _generate_simple_answer(self, question: str, context_docs: List[str]) -> str:
+    async def stream_answer(self, question: str, context_docs: List[str]) -> AsyncIterator[str]:
         """
-        Generate a simple answer based on retrieved context.
-        This is a placeholder - you'll replace this with LLM integration.
+        Stream an answer from already retrieved context documents as it is generated.
         
         Args:
             question (str): User's question
             context_docs (List[str]): Retrieved context documents
             
+        Yields:
+            str: Fragments of the generated answer
+        """
+        async for token in llm_client.generate_stream(question, context_docs):
+            yield token
+    
+    async def answer_question(self, question: str, topic: Optional[str] = None,
+                              embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Answer a question using RAG approach with DeepSeek LLM.
+        
+        Args:
+            question (str): User's question
+            topic (Optional[str]): Conversation topic; cached answers are only reused within the same topic
+            embedding (Optional[np.ndarray]): Precomputed embedding of the question, if already available
         Returns:
-            str: Generated answer
+            Dict[str, Any]: Contains the answer and retrieved context
         """
-        if not context_docs:
-            return "I couldn't find relevant information to answer your question."
+        cache = self.answer_cache
+        scope = f"rag:{topic}"
+        cached = None
+        if cache is not None:
+            cached = cache.get_exact(scope, question)
+            if cached is not None:
+                return {**cached, "question": question}
+            if embedding is None:
+                embedding = await asyncio.to_thread(cache.embed, question)
+            cached, _ = cache.query(scope, embedding)
         
-        # Simple keyword-based matching for demonstration
-        question_lower = question.lower()
+        # Step 1: Retrieve relevant context, reusing the cache lookup's embedding
+        context_docs = await self.search_context(question, top_k=3, embedding=embedding)
         
-        if "product" in question_lower or "what" in question_lower:
-            return f"Based on our product database, here are the most relevant items:\n\n" + \
-                   "\n".join([f"• {doc}" for doc in context_docs[:3]])
+        # A similar question's answer is only reused if it was generated from the same documents
+        if cached is not None and cached["context"] == context_docs:
+            return {**cached, "question": question}
         
-        elif "how many" in question_lower or "count" in question_lower:
-            return f"I found {len(context_docs)} relevant products in our database."
+        # Step 2: Generate answer using DeepSeek LLM
+        failed = False
+        try:
+            answer = await llm_client.generate(question, context_docs)
+        except Exception as e:
+            answer = f"Error generating answer with DeepSeek LLM: {str(e)}"
+            failed = True
         
-        else:
-            return f"Here's what I found related to your question:\n\n" + \
-                   "\n".join([f"• {doc}" for doc in context_docs[:3]])
-
-# Global instance for reuse
-rag_service = RAGService()
\ No newline at end of file
+        result = {
+            "question": question,
+            "answer": answer,
+            "context": context_docs,
+            "context_count": len(context_docs),
+            "failed": failed  # answer is error text; never cached
+        }
+        if cache is not None and not failed:
+            cache.set(scope, embedding, result, question=question)
+        return result
\ No newline at end of file
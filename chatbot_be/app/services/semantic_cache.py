@@ -0,0 +1,86 @@
+"""
+semantic_cache.py
+Semantic response cache that reuses answers for near-duplicate questions.
+Questions are embedded with the same model as the vector store and compared
+by cosine similarity against earlier questions from the same session.
+"""
+
+from typing import Any, List, Optional, Tuple
+import numpy as np
+
+from app.utils.cache import TTLCache
+
+class SemanticChatCache:
+    """
+    Per-session cache mapping question embeddings to previously generated responses.
+    Scoping entries by session keeps answers from leaking across conversations.
+    """
+
+    def __init__(self, model, threshold: float = 0.92, max_sessions: int = 1000,
+                 max_entries_per_session: int = 50, ttl_seconds: float = 1800,
+                 max_exact_entries: int = 4096):
+        """
+        Args:
+            model: VectorStore whose embed() is used for questions, so the
+                same embedding serves both cache lookups and retrieval
+            threshold: Minimum cosine similarity for a cache hit
+            max_sessions: Maximum number of sessions kept in the cache
+            max_entries_per_session: Maximum cached answers per session
+            ttl_seconds: Time after which an idle session's entries expire
+            max_exact_entries: Maximum entries in the exact-match tier
+        """
+        self.model = model
+        self.threshold = threshold
+        self.max_entries_per_session = max_entries_per_session
+        # session_id -> (embedding matrix, cached responses)
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl_seconds)
+        # (session_id, normalized question) -> response; checked before embedding
+        self._exact = TTLCache(maxsize=max_exact_entries, ttl=ttl_seconds)
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def get_exact(self, session_id: str, question: str) -> Optional[Any]:
+        """Return the response cached for this exact question (ignoring case and spacing)."""
+        return self._exact.get((session_id, self._normalize(question)))
+
+    def embed(self, question: str) -> np.ndarray:
+        """Embed a question as a unit-length float32 vector."""
+        return self.model.embed(question)
+
+    def query(self, session_id: str, embedding: np.ndarray) -> Tuple[Optional[Any], float]:
+        """
+        Find the most similar cached question in the session.
+
+        Returns:
+            Tuple of (cached response or None, best similarity score)
+        """
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None, 0.0
+
+        matrix, responses = entry
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        score = float(similarities[best])
+
+        if score < self.threshold:
+            return None, score
+        return responses[best], score
+
+    def set(self, session_id: str, embedding: np.ndarray, response: Any,
+            question: Optional[str] = None) -> None:
+        """Cache a response for the given question embedding (and exact text, if given)."""
+        if question is not None:
+            self._exact.set((session_id, self._normalize(question)), response)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            matrix = embedding[np.newaxis, :]
+            responses: List[Any] = [response]
+        else:
+            matrix, responses = entry
+            matrix = np.vstack([matrix, embedding])[-self.max_entries_per_session:]
+            responses = (responses + [response])[-self.max_entries_per_session:]
+
+        self._sessions.set(session_id, (matrix, responses))
@@ -3,9 +3,37 @@ session_manager.py
 Manages conversation sessions and maintains context across multiple interactions.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Deque, Dict, List, Optional, Any, Tuple
+from collections import deque
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+import heapq
+import re
+import time
 import uuid
+import numpy as np
+from app.core.config import settings
+
+# Keyword matchers compiled once; first match wins, in insertion order.
+# Plain alternations keep the substring semantics ("products" matches "product").
+_TOPIC_RE = {
+    "products": re.compile("product|item|food|beverage", re.IGNORECASE),
+    "customers": re.compile("customer|client|buyer", re.IGNORECASE),
+    "orders": re.compile("order|purchase|sale", re.IGNORECASE),
+}
+_INTENT_RE = {
+    "counting": re.compile("how many|count|total|number", re.IGNORECASE),
+    "comparing": re.compile("compare|difference|versus|vs", re.IGNORECASE),
+    "browsing": re.compile("list|show|what|which", re.IGNORECASE),
+}
+
+@lru_cache(maxsize=4096)
+def _classify_question(question: str) -> Tuple[Optional[str], Optional[str]]:
+    """Detect (topic, intent) for a question; memoized since users repeat questions."""
+    topic = next((name for name, pattern in _TOPIC_RE.items() if pattern.search(question)), None)
+    intent = next((name for name, pattern in _INTENT_RE.items() if pattern.search(question)), None)
+    return topic, intent
 
 class ConversationSession:
     """
@@ -13,13 +41,16 @@ class ConversationSession:
     Stores conversation history, context, and user intent.
     """
     
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, max_history: int = settings.max_conversation_history):
         self.session_id = session_id
         self.created_at = datetime.now()
-        self.last_activity = datetime.now()
+        # Monotonic clock for expiry checks (immune to wall-clock changes); the
+        # wall-clock last_activity is only derived when it is displayed
+        self.last_activity_monotonic = time.monotonic()
         
-        # Store conversation history - list of (question, answer, metadata) tuples
-        self.conversation_history: List[Dict[str, Any]] = []
+        # Store the most recent interactions; older ones are dropped so memory stays bounded
+        self.conversation_history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+        self.turn_count = 0  # interactions ever added, including dropped ones
         
         # Track what the user is currently exploring
         self.current_context = {
@@ -31,8 +62,22 @@ class ConversationSession:
         
         # Store any clarifications needed
         self.pending_clarifications: List[str] = []
+        
+        # last_n -> summary text; cleared whenever history changes
+        self._summary_cache: Dict[int, str] = {}
+        
+        # Question embeddings as contiguous float32 rows (allocated on first use), one
+        # slot per retained turn: turn t lives in row t % max_history, like the history deque
+        self._turn_embs: Optional[np.ndarray] = None
+        self._has_emb = np.zeros(max_history, dtype=bool)
     
-    def add_interaction(self, question: str, answer: str, query_type: str, metadata: Dict[str, Any] = None):
+    @property
+    def last_activity(self) -> datetime:
+        """Local wall-clock time of the last activity."""
+        return datetime.now() - timedelta(seconds=time.monotonic() - self.last_activity_monotonic)
+    
+    def add_interaction(self, question: str, answer: str, query_type: str, metadata: Dict[str, Any] = None,
+                        question_embedding: Optional[np.ndarray] = None) -> int:
         """
         Add a new question-answer pair to the conversation history.
         
@@ -41,11 +86,17 @@ class ConversationSession:
             answer: System's response
             query_type: Type of query used ("RAG" or "SQL")
             metadata: Additional context like retrieved documents, SQL query, etc.
+            question_embedding: Unit-length embedding of the question, used by search_history()
+            
+        Returns:
+            int: Id of the new interaction, for get_interaction()
         """
-        self.last_activity = datetime.now()
+        self.last_activity_monotonic = time.monotonic()
+        self._summary_cache.clear()
         
         interaction = {
-            "timestamp": self.last_activity,
+            "id": self.turn_count,  # stable across history rotation; see get_interaction()
+            "timestamp": time.time(),  # Unix time
             "question": question,
             "answer": answer,
             "query_type": query_type,
@@ -53,32 +104,78 @@ class ConversationSession:
         }
         
         self.conversation_history.append(interaction)
+        self._set_turn_embedding(self.turn_count, question_embedding)
+        self.turn_count += 1
         
         # Update current context based on the interaction
         self._update_context(question, query_type, metadata)
+        return interaction["id"]
+    
+    def _set_turn_embedding(self, turn: int, embedding: Optional[np.ndarray]):
+        """Store a turn's question embedding in its ring slot, overwriting the dropped turn's."""
+        slot = turn % self._has_emb.shape[0]
+        if embedding is None:
+            self._has_emb[slot] = False
+            return
+        if self._turn_embs is None:
+            self._turn_embs = np.empty((self._has_emb.shape[0], embedding.shape[0]), dtype=np.float32)
+        self._turn_embs[slot] = embedding
+        self._has_emb[slot] = True
+    
+    def get_interaction(self, interaction_id: int) -> Optional[Dict[str, Any]]:
+        """Return the interaction with the given id, or None if it was never added or has been dropped."""
+        # Ids are consecutive turn numbers, so the position follows from the oldest retained turn
+        index = interaction_id - (self.turn_count - len(self.conversation_history))
+        if 0 <= index < len(self.conversation_history):
+            return self.conversation_history[index]
+        return None
+    
+    def recent_interactions(self, n: int) -> List[Dict[str, Any]]:
+        """Return the last n interactions, oldest first."""
+        return list(islice(self.conversation_history, max(0, len(self.conversation_history) - n), None))
+    
+    def search_history(self, query_embedding: np.ndarray, k: int = 3) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Find the earlier interactions whose questions are most similar to a query.
+        
+        Args:
+            query_embedding: Unit-length embedding of the query
+            k: Maximum number of interactions to return
+            
+        Returns:
+            List of (interaction, cosine similarity) tuples, best first
+        """
+        slots = np.flatnonzero(self._has_emb)
+        k = min(k, slots.shape[0])
+        if k <= 0:
+            return []
+        
+        scores = self._turn_embs[slots] @ query_embedding
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        # Slot -> position in the history deque, counted from its oldest retained turn
+        first_turn = self.turn_count - len(self.conversation_history)
+        capacity = self._has_emb.shape[0]
+        return [
+            (self.conversation_history[(slots[i] - first_turn) % capacity], float(scores[i]))
+            for i in top
+        ]
+    
+    def topic_for(self, question: str) -> Optional[str]:
+        """Topic a question is answered under: the one it names, else the conversation's current one."""
+        return _classify_question(question)[0] or self.current_context["topic"]
     
     def _update_context(self, question: str, query_type: str, metadata: Dict[str, Any]):
         """
         Update the current conversation context based on the latest interaction.
         This helps maintain continuity in the conversation.
         """
-        question_lower = question.lower()
-        
-        # Detect topic from question
-        if any(word in question_lower for word in ["product", "item", "food", "beverage"]):
-            self.current_context["topic"] = "products"
-        elif any(word in question_lower for word in ["customer", "client", "buyer"]):
-            self.current_context["topic"] = "customers"
-        elif any(word in question_lower for word in ["order", "purchase", "sale"]):
-            self.current_context["topic"] = "orders"
-        
-        # Detect intent from question
-        if any(word in question_lower for word in ["how many", "count", "total", "number"]):
-            self.current_context["intent"] = "counting"
-        elif any(word in question_lower for word in ["compare", "difference", "versus", "vs"]):
-            self.current_context["intent"] = "comparing"
-        elif any(word in question_lower for word in ["list", "show", "what", "which"]):
-            self.current_context["intent"] = "browsing"
+        # Detect topic and intent from question; undetected ones keep their previous value
+        topic, intent = _classify_question(question)
+        if topic is not None:
+            self.current_context["topic"] = topic
+        if intent is not None:
+            self.current_context["intent"] = intent
         
         # Store the query type used
         self.current_context["last_query_type"] = query_type
@@ -91,21 +188,28 @@ class ConversationSession:
         if not self.conversation_history:
             return "No previous conversation."
         
+        cached = self._summary_cache.get(last_n)
+        if cached is not None:
+            return cached
+        
         # Get the last N interactions
-        recent_history = self.conversation_history[-last_n:]
+        recent_history = self.recent_interactions(last_n)
         
         summary_parts = []
         for i, interaction in enumerate(recent_history, 1):
-            summary_parts.append(
-                f"Q{i}: {interaction['question']}\n"
-                f"A{i}: {interaction['answer'][:200]}{'...' if len(interaction['answer']) > 200 else ''}"
-            )
+            answer = interaction['answer']
+            if len(answer) > 200:
+                summary_parts.append(f"Q{i}: {interaction['question']}\nA{i}: {answer[:200]}...")
+            else:
+                summary_parts.append(f"Q{i}: {interaction['question']}\nA{i}: {answer}")
         
-        return "\n\n".join(summary_parts)
+        summary = "\n\n".join(summary_parts)
+        self._summary_cache[last_n] = summary
+        return summary
     
     def is_expired(self, timeout_minutes: int = 30) -> bool:
         """Check if the session has expired due to inactivity."""
-        return datetime.now() - self.last_activity > timedelta(minutes=timeout_minutes)
+        return time.monotonic() - self.last_activity_monotonic > timeout_minutes * 60
 
 
 class SessionManager:
@@ -114,9 +218,13 @@ class SessionManager:
     Handles session creation, retrieval, and cleanup.
     """
     
-    def __init__(self):
+    def __init__(self, timeout_minutes: int = 30):
         # Dictionary to store active sessions: session_id -> ConversationSession
         self.sessions: Dict[str, ConversationSession] = {}
+        self.timeout_minutes = timeout_minutes
+        # Min-heap of (expiry deadline, session_id), one entry per session. A deadline
+        # may be stale if the session was active since; cleanup re-checks and re-queues.
+        self._expiry_heap: List[Tuple[float, str]] = []
     
     def create_session(self) -> str:
         """
@@ -126,7 +234,9 @@ class SessionManager:
             str: Unique session ID
         """
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = ConversationSession(session_id)
+        session = ConversationSession(session_id)
+        self.sessions[session_id] = session
+        heapq.heappush(self._expiry_heap, (session.last_activity_monotonic + self.timeout_minutes * 60, session_id))
         return session_id
     
     def get_session(self, session_id: str) -> Optional[ConversationSession]:
@@ -145,21 +255,33 @@ class SessionManager:
         session = self.sessions[session_id]
         
         # Check if session is expired
-        if session.is_expired():
+        if session.is_expired(self.timeout_minutes):
             del self.sessions[session_id]
             return None
         
         return session
     
     def cleanup_expired_sessions(self):
-        """Remove expired sessions to free up memory."""
-        expired_sessions = [
-            session_id for session_id, session in self.sessions.items()
-            if session.is_expired()
-        ]
+        """
+        Remove expired sessions to free up memory.
+        Only heap entries whose deadline has passed are visited, so the cost
+        is proportional to the number of expired (or refreshed) sessions.
+        """
+        now = time.monotonic()
+        timeout = self.timeout_minutes * 60
+        heap = self._expiry_heap
         
-        for session_id in expired_sessions:
-            del self.sessions[session_id]
+        while heap and heap[0][0] <= now:
+            _, session_id = heapq.heappop(heap)
+            session = self.sessions.get(session_id)
+            if session is None:
+                continue  # already removed by get_session
+            
+            deadline = session.last_activity_monotonic + timeout
+            if deadline <= now:
+                del self.sessions[session_id]
+            else:
+                heapq.heappush(heap, (deadline, session_id))
     
     def get_or_create_session(self, session_id: Optional[str] = None) -> tuple[str, ConversationSession]:
         """
@@ -5,49 +5,187 @@ Uses LangChain SQL Agent to interact with the PostgreSQL Northwind database.
 """
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
 from langchain_community.utilities import SQLDatabase
+from langchain_community.utilities.sql_database import truncate_word
 from langchain_community.agent_toolkits import create_sql_agent
 from langchain_community.llms import Ollama
 import asyncio
 from app.core.config import settings
-from app.core.exceptions import SQLServiceException
+from app.core.exceptions import ChatbotBaseException, SQLServiceException
+from app.models.database import database
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Dedicated threads for blocking agent runs, sized to what the LLM can serve at once,
+# so they don't compete with other work on the default executor
+_SQL_EXECUTOR = ThreadPoolExecutor(max_workers=settings.sql_max_concurrency, thread_name_prefix="sql-agent")
+# Callers wait here rather than piling up in the executor's unbounded queue
+_SQL_SEMAPHORE = asyncio.Semaphore(settings.sql_max_concurrency)
+
+class AsyncpgSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase that executes the agent's queries on the application's asyncpg pool.
+    The agent runs in worker threads, so each query is handed to the event loop bound
+    with bind_loop(); without one (or when called on the loop itself) the SQLAlchemy
+    engine is used as before.
+    """
+    
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+    
+    def _pool_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return None
+        try:
+            # Blocking on the loop from its own thread would deadlock
+            if asyncio.get_running_loop() is loop:
+                return None
+        except RuntimeError:
+            pass
+        return loop
+    
+    def run(self, command: str, fetch: str = "all", include_columns: bool = False, **kwargs) -> Any:
+        loop = self._pool_loop()
+        if loop is None or fetch not in ("all", "one") or kwargs:
+            return super().run(command, fetch, include_columns, **kwargs)
+        
+        rows = asyncio.run_coroutine_threadsafe(database.fetch_records(command), loop).result()
+        if fetch == "one":
+            rows = rows[:1]
+        # Same rendering as SQLDatabase.run, so the agent sees identical observations
+        max_length = getattr(self, "_max_string_length", 300)
+        result = [
+            {column: truncate_word(value, length=max_length) for column, value in row.items()}
+            for row in rows
+        ]
+        if not include_columns:
+            result = [tuple(row.values()) for row in result]
+        return str(result) if result else ""
+    
+    def run_no_throw(self, command: str, fetch: str = "all", include_columns: bool = False, **kwargs) -> Any:
+        # Report errors to the agent as text so it can correct its SQL
+        try:
+            return self.run(command, fetch, include_columns, **kwargs)
+        except (SQLAlchemyError, ChatbotBaseException) as e:
+            return f"Error: {e}"
+
 class SQLClient:
     """Service for executing natural language SQL queries using LangChain."""
     
     def __init__(self):
-        self._db: Optional[SQLDatabase] = None
+        self._db: Optional[AsyncpgSQLDatabase] = None
         self._agent = None
         self._llm = None
+        # Agent answers by normalized question; shared by the async and sync paths, hence the lock
+        self._results = TTLCache(maxsize=settings.sql_cache_size, ttl=settings.sql_cache_ttl_seconds)
+        self._results_lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        # Normalized question -> agent run in progress
+        self._inflight: Dict[str, "asyncio.Future[str]"] = {}
+    
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+    
+    def _get_cached_result(self, question: str) -> Optional[str]:
+        with self._results_lock:
+            return self._results.get(self._normalize(question))
+    
+    def _cache_result(self, question: str, answer: str) -> None:
+        with self._results_lock:
+            self._results.set(self._normalize(question), answer)
+    
+    async def _run_agent(self, agent, question: str) -> str:
+        """Run the agent in its thread pool (to avoid blocking) and cache the answer."""
+        async with _SQL_SEMAPHORE:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(_SQL_EXECUTOR, agent.run, question)
+        self._cache_result(question, result)
+        return result
+    
+    def _finish_run(self, key: str, run: "asyncio.Future[str]") -> None:
+        self._inflight.pop(key, None)
+        # Retrieve the error so it isn't reported as unhandled if every waiter gave up
+        if not run.cancelled():
+            run.exception()
+    
+    def clear_cache(self) -> None:
+        """Drop cached agent answers, e.g. after the underlying data changes."""
+        with self._results_lock:
+            self._results.clear()
         
-    def _get_database(self) -> SQLDatabase:
+    def _build_database(self) -> AsyncpgSQLDatabase:
+        """Reflect the schema and render every table's info (blocking; run off the event loop)."""
+        try:
+            database_url = settings.database_url
+            logger.info(f"Connecting to database: {database_url.split('@')[1] if '@' in database_url else database_url}")
+            
+            # Queries go through the asyncpg pool; the engine is only needed for
+            # schema reflection, so it keeps no idle connections of its own
+            engine = create_engine(database_url, poolclass=NullPool)
+            probe = SQLDatabase(engine, sample_rows_in_table_info=3)
+            # Render each table's DDL and sample rows once; otherwise the agent's schema
+            # tool re-queries the catalogs and samples every table on each question
+            table_info = {table: probe.get_table_info([table]) for table in probe.get_usable_table_names()}
+            db = AsyncpgSQLDatabase(
+                engine,
+                include_tables=None,  # Include all tables
+                sample_rows_in_table_info=3,
+                custom_table_info=table_info
+            )
+            
+            logger.info("Successfully connected to PostgreSQL database")
+            return db
+            
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {str(e)}")
+            raise SQLServiceException(f"Database connection failed: {str(e)}")
+    
+    def _get_database(self) -> AsyncpgSQLDatabase:
         """Get or create SQLDatabase connection."""
         if self._db is None:
-            try:
-                database_url = settings.database_url
-                logger.info(f"Connecting to database: {database_url.split('@')[1] if '@' in database_url else database_url}")
-                
-                self._db = SQLDatabase.from_uri(
-                    database_url,
-                    include_tables=None,  # Include all tables
-                    sample_rows_in_table_info=3
-                )
-                
-                logger.info("Successfully connected to PostgreSQL database")
-                
-            except Exception as e:
-                logger.error(f"Failed to connect to database: {str(e)}")
-                raise SQLServiceException(f"Database connection failed: {str(e)}")
-        
+            # Startup warm-up and a first question may race; only one of them reflects
+            with self._schema_lock:
+                if self._db is None:
+                    self._db = self._build_database()
         return self._db
     
+    def warm_up(self) -> None:
+        """Precompute the table info at startup so the first SQL question doesn't pay for reflection."""
+        self._get_database()
+    
+    def refresh_schema(self) -> int:
+        """
+        Rebuild the cached table info and the agent after a schema change.
+        Cached answers are dropped too, since they may describe the old schema.
+        Questions keep using the old table info until the new one is ready.
+        
+        Returns:
+            Number of tables now visible to the agent
+        """
+        db = self._build_database()
+        with self._schema_lock:
+            self._db = db
+            self._agent = None
+        self.clear_cache()
+        return len(db.get_usable_table_names())
+    
     def _get_llm(self) -> Ollama:
         """Get or create Ollama LLM instance."""
         if self._llm is None:
+            # Same Ollama server and model as llm_client, which serves RAG
             self._llm = Ollama(
+                base_url=settings.ollama_base_url,
                 model=settings.llm_model,
                 temperature=settings.llm_temperature
             )
@@ -63,7 +201,7 @@ class SQLClient:
                 self._agent = create_sql_agent(
                     llm=llm,
                     db=db,
-                    verbose=True,
+                    verbose=settings.sql_agent_verbose,
                     handle_parsing_errors=True
                 )
                 
@@ -85,12 +223,31 @@ class SQLClient:
         Returns:
             Dictionary containing the query results and metadata
         """
+        # Only exact repeats are answered from cache: near-identical questions that differ
+        # in a literal ("in 1997" vs "in 1998") need their own agent run
+        answer = self._get_cached_result(question)
+        if answer is not None:
+            return {
+                "success": True,
+                "question": question,
+                "answer": answer,
+                "query_type": "natural_language_sql"
+            }
+        
         try:
-            agent = self._get_agent()
+            # Building the agent reflects the schema (unless warmed up at startup); keep it off the loop
+            agent = self._agent or await asyncio.to_thread(self._get_agent)
+            self._get_database().bind_loop(asyncio.get_running_loop())
             
-            # Execute the query in a thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, agent.run, question)
+            # Identical questions already being answered share that agent run
+            key = self._normalize(question)
+            run = self._inflight.get(key)
+            if run is None:
+                run = asyncio.ensure_future(self._run_agent(agent, question))
+                self._inflight[key] = run
+                run.add_done_callback(lambda done: self._finish_run(key, done))
+            # Shielded so one caller timing out doesn't cancel the run for the others
+            result = await asyncio.shield(run)
             
             return {
                 "success": True,
@@ -118,9 +275,14 @@ class SQLClient:
         Returns:
             String containing the answer
         """
+        answer = self._get_cached_result(question)
+        if answer is not None:
+            return answer
+        
         try:
             agent = self._get_agent()
             result = agent.run(question)
+            self._cache_result(question, result)
             return result
             
         except Exception as e:
@@ -135,7 +297,7 @@ class SQLClient:
             Dictionary containing table information
         """
         try:
-            db = self._get_database()
+            db = await asyncio.to_thread(self._get_database)
             
             return {
                 "success": True,
@@ -158,7 +320,7 @@ class SQLClient:
             Dictionary containing connection status
         """
         try:
-            db = self._get_database()
+            db = await asyncio.to_thread(self._get_database)
             
             # Try a simple query to validate connection
             result = db.run("SELECT 1 as test")
@@ -181,7 +343,7 @@ sql_client = SQLClient()
 
 # Legacy function names for backward compatibility
 async def ask_sql_agent(question: str) -> str:
-    """Legacy function for backward compatibility."""
+    """Answer a question with the SQL agent, run on the dedicated agent threads."""
     result = await sql_client.execute_natural_language_query(question)
     if result["success"]:
         return result["answer"]
@@ -191,3 +353,11 @@ async def ask_sql_agent(question: str) -> str:
 def ask_sql_agent_sync(question: str) -> str:
     """Legacy synchronous function for backward compatibility."""
     return sql_client.execute_natural_language_query_sync(question)
+
+def shutdown_sql_executor() -> None:
+    """Stop the agent threads, dropping queued runs; called on application shutdown."""
+    _SQL_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+def clear_sql_cache() -> None:
+    """Invalidate cached SQL agent answers; call after writes to the database."""
+    sql_client.clear_cache()
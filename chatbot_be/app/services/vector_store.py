@@ -3,19 +3,117 @@ vector_store.py
 Service for embedding text and storing/searching vectors using FAISS.
 """
 
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from functools import lru_cache
 from typing import List, Tuple
 import numpy as np
+import orjson
 import faiss
 from sentence_transformers import SentenceTransformer
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Corpus sizes at which exact float32 search gives way to compressed indexes
+SQ8_MIN_DOCS = 1_000
+IVFSQ8_MIN_DOCS = 10_000
+IVFPQ_MIN_DOCS = 50_000
+# Exact top-k with numpy beats a FAISS round-trip for the corpora that would
+# otherwise get a flat index; larger ones are searched through their int8 index
+NUMPY_SEARCH_MAX_DOCS = SQ8_MIN_DOCS
+
+def load_embedding_model(model_name: str) -> SentenceTransformer:
+    """
+    Load the sentence embedding model with the configured backend.
+    The ONNX backend releases the GIL during inference and the int8 export
+    halves weight traffic; it falls back to PyTorch if onnxruntime is missing.
+    """
+    if settings.embedding_backend == "onnx":
+        try:
+            return SentenceTransformer(
+                model_name,
+                backend="onnx",
+                model_kwargs={"file_name": settings.embedding_onnx_file}
+            )
+        except Exception as e:
+            logger.warning(f"ONNX embedding backend unavailable, using PyTorch: {str(e)}")
+    return SentenceTransformer(model_name)
 
 class VectorStore:
     """
     Handles embedding and vector search using FAISS.
     """
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = settings.embedding_model):
+        self.model_name = model_name
+        self._model = None
+        self._model_lock = threading.Lock()
         self.index = None
+        self._matrix = None  # normalized embeddings, kept for small corpora
         self.texts = []  # Store original texts for retrieval
+        self.index_version = 0  # bumped whenever the index is replaced, to invalidate search caches
+        # Persistent embeddings keyed by text hash; a no-op unless REDIS_URL is set
+        self.embedding_cache = EmbeddingCache(
+            settings.redis_url,
+            namespace=f"{model_name}:{settings.embedding_backend}",
+            ttl_seconds=settings.embedding_cache_ttl_seconds
+        )
+        # Repeated questions skip the transformer forward pass
+        self._embed_query = lru_cache(maxsize=1024)(self._encode_query)
+
+    @property
+    def model(self) -> SentenceTransformer:
+        """The embedding model, loaded on first use (thread-safe)."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_embedding_model(self.model_name)
+        return self._model
+
+    def encode(self, *args, **kwargs) -> np.ndarray:
+        """Embed texts with the (lazily loaded) model; arguments are passed to SentenceTransformer.encode."""
+        return self.model.encode(*args, **kwargs)
+
+    def encode_cached(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Embed texts as normalized float32 rows, reusing vectors from the embedding cache.
+        Only cache misses go through the model, in batches of batch_size.
+        """
+        cached = self.embedding_cache.get_many(texts)
+        misses = [i for i, embedding in enumerate(cached) if embedding is None]
+        if len(misses) == len(texts):
+            embeddings = self.model.encode(
+                texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+            ).astype(np.float32, copy=False)
+            self.embedding_cache.set_many(texts, embeddings)
+            return embeddings
+        # Fill one preallocated matrix in place: cached rows first, then the fresh ones
+        dim = next(embedding for embedding in cached if embedding is not None).shape[0]
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        for i, embedding in enumerate(cached):
+            if embedding is not None:
+                embeddings[i] = embedding
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            computed = self.model.encode(
+                miss_texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+            ).astype(np.float32, copy=False)
+            self.embedding_cache.set_many(miss_texts, computed)
+            embeddings[misses] = computed
+        return embeddings
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Embed a single query as a normalized (1, dim) float32 row."""
+        return self.encode_cached([query])
+
+    def embed(self, query: str) -> np.ndarray:
+        """Embed a query as a unit-length float32 vector (cached per query string)."""
+        return self._embed_query(query)[0]
 
     def build_index(self, texts: List[str]):
         """
@@ -24,10 +122,148 @@ class VectorStore:
             texts (List[str]): List of texts to embed and index.
         """
         self.texts = texts
-        embeddings = self.model.encode(texts, show_progress_bar=True)
-        embeddings = np.array(embeddings).astype('float32')
-        self.index = faiss.IndexFlatL2(embeddings.shape[1])
+        # Unit-length vectors make inner product equal to cosine similarity
+        embeddings = self.encode_cached(texts, batch_size=64)
+        self.index = self._create_index(embeddings)
         self.index.add(embeddings)
+        self._matrix = embeddings if len(texts) < NUMPY_SEARCH_MAX_DOCS else None
+        self.index_version += 1
+
+    def corpus_hash(self, texts: List[str]) -> str:
+        """Hash of the corpus and embedding model; identifies a persisted index."""
+        digest = hashlib.sha256(f"{self.embedding_cache.namespace}\n".encode())
+        digest.update("\n".join(sorted(texts)).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _write_atomic(path: str, write) -> None:
+        """
+        Call write(tmp_path) on a uniquely named temporary file next to path, then rename it into place.
+        Processes saving the same index at once (e.g. the API and rag_pipeline) never share a temp file.
+        """
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.",
+                                         suffix=".tmp", delete=False) as f:
+            tmp = f.name
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def save(self, index_path: str) -> None:
+        """
+        Write the index, (for small corpora) the embedding matrix, and last its texts,
+        which load() requires, so a partly saved index is never loaded.
+        Each file is written to its own temporary path and renamed into place.
+        """
+        def write_matrix(tmp: str) -> None:
+            # A file object, since np.save appends ".npy" to paths without it
+            with open(tmp, "wb") as f:
+                np.save(f, self._matrix)
+
+        def write_texts(tmp: str) -> None:
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(self.texts))
+
+        self._write_atomic(index_path, lambda tmp: faiss.write_index(self.index, tmp))
+        if self._matrix is not None:
+            self._write_atomic(f"{index_path}.npy", write_matrix)
+        self._write_atomic(f"{index_path}.texts.json", write_texts)
+
+    def load(self, index_path: str) -> bool:
+        """
+        Memory-map a persisted index written by save(); pages are read on demand.
+        Returns:
+            bool: False if no complete index exists at index_path
+        """
+        texts_path = f"{index_path}.texts.json"
+        if not (os.path.exists(index_path) and os.path.exists(texts_path)):
+            return False
+        with open(texts_path, "rb") as f:
+            texts = orjson.loads(f.read())
+        matrix = None
+        if len(texts) < NUMPY_SEARCH_MAX_DOCS:
+            if not os.path.exists(f"{index_path}.npy"):
+                return False
+            matrix = np.load(f"{index_path}.npy", mmap_mode="r")
+        self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        self.texts = texts
+        self._matrix = matrix
+        self.index_version += 1
+        return True
+
+    def load_or_build(self, texts: List[str], directory: str) -> bool:
+        """
+        Load the persisted index for this corpus if present, otherwise build and persist it.
+        Args:
+            texts (List[str]): List of texts to index.
+            directory (str): Directory holding persisted indexes.
+        Returns:
+            bool: True if an existing index was loaded
+        """
+        index_path = os.path.join(directory, f"vector_{self.corpus_hash(texts)}.index")
+        try:
+            if self.load(index_path):
+                logger.info(f"Loaded vector index from {index_path}")
+                return True
+        except Exception as e:
+            logger.warning(f"Could not load vector index {index_path}, rebuilding: {str(e)}")
+
+        self.build_index(texts)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.save(index_path)
+            # Indexes for earlier corpora are never read again; temp files belong to saves in progress
+            for stale in glob.glob(os.path.join(directory, "vector_*.index*")):
+                if not stale.startswith(index_path) and not stale.endswith(".tmp"):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass  # another process cleaned it up first
+        except OSError as e:
+            logger.warning(f"Could not persist vector index to {directory}: {str(e)}")
+        return False
+
+    def _topk(self, scores: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        """Select the top_k scores with argpartition (O(n)) and sort only those."""
+        k = min(top_k, scores.shape[0])
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(self.texts[i], float(scores[i])) for i in idx]
+
+    @staticmethod
+    def _create_index(embeddings: np.ndarray) -> faiss.Index:
+        """
+        Pick an inner-product index for the corpus size, training it if needed.
+        Small corpora keep exact float32 search; larger ones store int8 codes
+        (4x less memory traffic per query), scanning only the nearest IVF lists
+        past IVFSQ8_MIN_DOCS, and very large ones use IVF-PQ.
+        """
+        n, dim = embeddings.shape
+        if n < SQ8_MIN_DOCS:
+            return faiss.IndexFlatIP(dim)
+        if n >= IVFPQ_MIN_DOCS and dim % 48 == 0:
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, 256, 48, 8, faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+            index.nprobe = 8
+            return index
+        if n >= IVFSQ8_MIN_DOCS:
+            # ~sqrt(n) lists keeps at least 39 training points per centroid
+            nlist = int(np.sqrt(n))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(embeddings)
+            index.nprobe = max(8, nlist // 16)
+            return index
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        return index
 
     def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
         """
@@ -36,11 +272,24 @@ class VectorStore:
             query (str): The query string.
             top_k (int): Number of top results to return.
         Returns:
-            List[Tuple[str, float]]: List of (text, score) tuples.
+            List[Tuple[str, float]]: List of (text, cosine similarity) tuples, best first.
+        """
+        return self.search_with_embedding(self.embed(query), top_k)
+
+    def search_with_embedding(self, embedding: np.ndarray, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Search with an already computed query embedding (see embed()).
+        Args:
+            embedding (np.ndarray): Unit-length float32 query vector.
+            top_k (int): Number of top results to return.
+        Returns:
+            List[Tuple[str, float]]: List of (text, cosine similarity) tuples, best first.
         """
         if self.index is None:
             raise ValueError("Index not built. Call build_index() first.")
-        query_emb = self.model.encode([query]).astype('float32')
-        D, I = self.index.search(query_emb, top_k)
-        results = [(self.texts[i], float(D[0][idx])) for idx, i in enumerate(I[0])]
+        if self._matrix is not None:
+            return self._topk(self._matrix @ embedding, top_k)
+        D, I = self.index.search(embedding[np.newaxis, :], top_k)
+        # FAISS pads with -1 when top_k exceeds the number of indexed texts
+        results = [(self.texts[i], float(D[0][idx])) for idx, i in enumerate(I[0]) if i >= 0]
         return results
@@ -4,7 +4,6 @@ Runs the FastAPI server with proper configuration.
 """
 
 import uvicorn
-from app.api.server import app
 from app.core.config import settings
 
 if __name__ == "__main__":
@@ -13,5 +12,10 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.reload,
+        # uvicorn ignores workers when reload is enabled. Sessions are per process, so
+        # more than one worker loses conversations (see README)
+        workers=1 if settings.reload else settings.workers,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
\ No newline at end of file
@@ -5,19 +5,138 @@ Clean, reliable interface that avoids complex type issues.
 
 import streamlit as st
 import requests
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional
+from urllib3.util.retry import Retry
+import threading
 import time
 
+# Sidebar examples; they don't refer back to earlier turns, so their answers can be reused
+EXAMPLE_QUESTIONS = [
+    "How many products do we have?",
+    "Tell me about our customers",
+    "What are our product categories?",
+    "Show me recent orders",
+    "What's the total revenue?"
+]
+
+def _normalize(message: str) -> str:
+    """Case- and whitespace-insensitive form of a question, used as a cache key."""
+    return " ".join(message.lower().split())
+
 class ChatClient:
     """Simple client for the conversational AI backend."""
     
+    HEALTH_TTL = 10.0  # seconds a health probe result is reused
+    ANSWER_CACHE_SIZE = 256  # answers kept for repeated questions
+    ANSWER_CACHE_TTL = 300.0  # seconds a cached answer is reused
+    # Only self-contained questions are cached: a follow-up like "show me more" depends on
+    # the turns before it, so repeating it must reach the backend again
+    CACHEABLE_QUESTIONS = frozenset(_normalize(q) for q in EXAMPLE_QUESTIONS)
+    
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.base_url = base_url
+        # One keep-alive session so each question reuses the open connection
+        # instead of paying for a new socket. The client is shared by every
+        # browser session, so keep enough idle connections for concurrent questions
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=self._retry_policy())
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Health probes fail fast instead of backing off, so an offline backend doesn't stall the page
+        self.session.mount(f"{base_url}/api/v1/health", HTTPAdapter(max_retries=0))
+        # Last health probe as (monotonic time, healthy); reused for HEALTH_TTL seconds
+        self._health: Optional[tuple] = None
+        # (session_id, normalized question) -> (expiry, response), oldest first;
+        # the client is shared across Streamlit threads, hence the lock
+        self._answers: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._answers_lock = threading.Lock()
+        # Same key -> request in progress; a double-submitted question waits for it (guarded by the same lock)
+        self._inflight: Dict[tuple, Future] = {}
+        
+    @staticmethod
+    def _retry_policy() -> Retry:
+        """
+        Retry transient failures with jittered exponential backoff (immediately, then ~2s, ~4s; at most 30s).
+        Questions (POST) are only retried on connection errors, when they never reached
+        the backend: after a read timeout or a 502/504 it may still be answering, and a
+        second POST would make it generate the same answer again as a duplicate turn.
+        """
+        return Retry(
+            total=3,
+            read=0,
+            backoff_factor=1.0,
+            backoff_max=30,
+            backoff_jitter=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),  # connect errors are retried for every method
+            respect_retry_after_header=True,
+            raise_on_status=False  # hand the last error response back to ask()
+        )
         
+    def _get_cached_answer(self, key: tuple) -> Optional[dict]:
+        with self._answers_lock:
+            entry = self._answers.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._answers[key]
+                return None
+            self._answers.move_to_end(key)
+            return dict(entry[1])
+    
+    def _cache_answer(self, key: tuple, response: dict) -> None:
+        with self._answers_lock:
+            self._answers[key] = (time.monotonic() + self.ANSWER_CACHE_TTL, response)
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.ANSWER_CACHE_SIZE:
+                self._answers.popitem(last=False)
+    
     def ask(self, message: str, session_id: Optional[str] = None) -> dict:
-        """Send message and get AI response."""
+        """
+        Send message and get AI response.
+        An example question repeated within the same conversation is answered from
+        memory; any question already in progress shares that request.
+        """
+        # Without a session id the backend would start a new conversation, so never reuse those
+        if session_id is None:
+            return self._post_question(message, session_id)
+        
+        key = (session_id, _normalize(message))
+        cacheable = key[1] in self.CACHEABLE_QUESTIONS
+        if cacheable:
+            cached = self._get_cached_answer(key)
+            if cached is not None:
+                return cached
+        
+        # Single-flight: an identical question already on its way to the backend is awaited, not resent
+        with self._answers_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future = self._inflight[key] = Future()
+        if pending is not None:
+            try:
+                return dict(pending.result())
+            except CancelledError:
+                return self._post_question(message, session_id)  # the first request was interrupted
+        
+        try:
+            result = self._post_question(message, session_id)
+            if cacheable and result.get("query_type_used") not in ("ERROR", "CLARIFICATION"):
+                self._cache_answer(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            future.cancel()  # no-op once a result is set; otherwise releases waiters
+            with self._answers_lock:
+                del self._inflight[key]
+    
+    def _post_question(self, message: str, session_id: Optional[str]) -> dict:
+        """POST a question to the chat endpoint; failures are returned as ERROR responses."""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/v1/chat",
                 json={
                     "question": message,
@@ -54,6 +173,40 @@ class ChatClient:
                 "query_type_used": "ERROR",
                 "session_id": session_id
             }
+    
+    def warm_up(self):
+        """Open a keep-alive connection to the backend so the first question skips connection setup."""
+        try:
+            self.session.get(f"{self.base_url}/", timeout=2)
+        except requests.exceptions.RequestException:
+            pass  # the first question connects on its own
+    
+    def health_check(self) -> bool:
+        """
+        Return True if the backend health endpoint responds with 200.
+        The result is cached for HEALTH_TTL seconds so reruns don't add a round-trip per question.
+        """
+        now = time.monotonic()
+        if self._health is not None and now - self._health[0] < self.HEALTH_TTL:
+            return self._health[1]
+        
+        try:
+            healthy = self.session.get(f"{self.base_url}/api/v1/health", timeout=2).status_code == 200
+        except requests.exceptions.RequestException:
+            healthy = False
+        self._health = (now, healthy)
+        return healthy
+
+def queue_prompt(prompt: str):
+    """Button callback: hand an example question to the chat input branch of this run."""
+    st.session_state.pending_prompt = prompt
+
+@st.cache_resource
+def get_client() -> ChatClient:
+    """Shared client, kept across Streamlit reruns so its connections stay open."""
+    client = ChatClient()
+    threading.Thread(target=client.warm_up, daemon=True).start()
+    return client
 
 def main():
     """Main Streamlit app."""
@@ -66,7 +219,7 @@ def main():
     )
     
     # Initialize client
-    client = ChatClient()
+    client = get_client()
     
     # Initialize session state
     if "messages" not in st.session_state:
@@ -90,8 +243,10 @@ def main():
                 if "query_type" in message and message["query_type"]:
                     st.caption(f"*[{message['query_type']} approach used]*")
     
-    # Chat input
-    if prompt := st.chat_input("Ask me anything about your database..."):
+    # Chat input; example buttons queue their question through the same path
+    prompt = st.chat_input("Ask me anything about your database...") or st.session_state.pop("pending_prompt", None)
+    # Whitespace-only submissions never reach the backend or start the spinner
+    if prompt and prompt.strip():
         
         # Add user message to chat
         st.session_state.messages.append({"role": "user", "content": prompt})
@@ -128,37 +283,11 @@ def main():
     with st.sidebar:
         st.markdown("### 💡 Example Questions")
         
-        examples = [
-            "How many products do we have?",
-            "Tell me about our customers", 
-            "What are our product categories?",
-            "Show me recent orders",
-            "What's the total revenue?"
-        ]
-        
-        for example in examples:
-            if st.button(example, key=f"example_{example}", use_container_width=True):
-                # Add example to chat input (this will trigger the chat)
-                st.session_state.messages.append({"role": "user", "content": example})
-                
-                # Get AI response for example
-                with st.spinner("Processing example..."):
-                    response = client.ask(example, st.session_state.session_id)
-                    
-                    if response.get("session_id"):
-                        st.session_state.session_id = response["session_id"]
-                    
-                    answer = response.get("answer", "No answer provided") 
-                    query_type = response.get("query_type_used", "")
-                    
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": answer,
-                        "query_type": query_type if query_type != "ERROR" else None
-                    })
-                
-                # Rerun to show the new messages
-                st.rerun()
+        for example in EXAMPLE_QUESTIONS:
+            # The callback runs before the rerun the click triggers, so the question
+            # is answered in that same run without an extra st.rerun()
+            st.button(example, key=f"example_{example}", use_container_width=True,
+                      on_click=queue_prompt, args=(example,))
         
         st.markdown("---")
         
@@ -170,13 +299,9 @@ def main():
         
         # Connection status
         st.markdown("### 🔗 Connection Status")
-        try:
-            test_response = requests.get("http://127.0.0.1:8000/api/v1/health", timeout=5)
-            if test_response.status_code == 200:
-                st.success("✅ Backend Connected")
-            else:
-                st.error("❌ Backend Error")
-        except:
+        if client.health_check():
+            st.success("✅ Backend Connected")
+        else:
             st.error("❌ Backend Offline")
 
 if __name__ == "__main__":